@@ -1,22 +1,34 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from config import Config
+from app.utils.db_routing import STICKY_HEADER, RoutingSession, configure_engines, init_db_routing
+from app.utils.instrumentation import init_instrumentation
+from app.utils.json_provider import PawPalsJSONProvider
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = PawPalsJSONProvider(app)  # orjson-backed when installed
 
+    configure_engines(app)  # Pool tuning and read-replica binds
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_db_routing(app)
+    init_instrumentation(app)  # Latency/SQL metrics served at /metrics
+    from app.utils.idempotency import init_idempotency
+    init_idempotency(app)  # Replays POST responses for retried Idempotency-Key requests
+    from app.services.partition_service import include_in_migrations
+    migrate.init_app(app, db, include_object=include_in_migrations)  # Playdate partitions are managed outside migrations
     jwt.init_app(app)
-    CORS(app)  # Enable CORS for all routes, or configure specific origins
+    # Enable CORS for all routes, or configure specific origins. Browsers only let scripts read the response headers
+    # listed here (beyond a few standard ones), and clients need these to see their writes and retry correctly.
+    CORS(app, expose_headers=[STICKY_HEADER, "Idempotent-Replayed", "Retry-After"])
 
     # Register Blueprints here
     from app.routes.auth_routes import bp as auth_bp
@@ -35,6 +47,33 @@ def create_app(config_class=Config):
     app.register_blueprint(playdate_bp, url_prefix=
 "/api")
 
+    from app.routes.review_routes import bp as review_bp
+    app.register_blueprint(review_bp, url_prefix=
+"/api")
+
+    from app.routes.sync_routes import bp as sync_bp
+    app.register_blueprint(sync_bp, url_prefix=
+"/api")
+
+    from app.routes.batch_routes import bp as batch_bp
+    app.register_blueprint(batch_bp, url_prefix=
+"/api")
+
+    from app.routes.media_routes import bp as media_bp
+    app.register_blueprint(media_bp) # Uploads at /api/media, files served from /media
+
+    from app.routes.metrics_routes import bp as metrics_bp
+    app.register_blueprint(metrics_bp)
+
+    from app.cli import register_commands
+    register_commands(app)
+
+    from app.models.enums import InvalidChoice
+    @app.errorhandler(InvalidChoice)
+    def invalid_choice(e):
+        # A size, type or status outside app/models/enums.py, from a request body or filter
+        return jsonify({"message": str(e)}), 400
+
     # Basic route for testing
     @app.route("/health")
     def health_check():
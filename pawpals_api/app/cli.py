@@ -0,0 +1,65 @@
+"""Maintenance commands, run with `flask <command>` (FLASK_APP=run.py)."""
+
+import click
+from flask import current_app
+
+
+def register_commands(app):
+    @app.cli.command("purge-tombstones")
+    @click.option("--days", type=int, default=None, help="Keep tombstones newer than this (default SYNC_TOMBSTONE_RETENTION_DAYS).")
+    def purge_tombstones_command(days):
+        """Delete sync tombstones older than the retention window."""
+        from app.services.sync_service import purge_tombstones
+        days = current_app.config["SYNC_TOMBSTONE_RETENTION_DAYS"] if days is None else days
+        click.echo(f"Purged {purge_tombstones(days)} tombstones older than {days} days")
+
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys_command():
+        """Delete stored Idempotency-Key responses past their TTL."""
+        from app.utils.idempotency import purge_expired_keys
+        click.echo(f"Purged {purge_expired_keys()} expired idempotency keys")
+
+    @app.cli.command("purge-deleted")
+    @click.option("--batch-size", type=int, default=None, help="Rows per transaction (default PURGE_BATCH_SIZE).")
+    def purge_deleted_command(batch_size):
+        """Hard-delete soft-deleted users and dogs, with their playdates and reviews."""
+        from app.services.purge_service import purge_deleted
+        removed = purge_deleted(batch_size)
+        if removed is None:
+            click.echo("Another purge is in progress; nothing to do")
+            return
+        click.echo(
+            f"Purged {removed['users']} users, {removed['dogs']} dogs, {removed['playdates']} playdates "
+            f"and {removed['reviews']} reviews"
+        )
+
+    @app.cli.command("recompute-place-ratings")
+    def recompute_place_ratings_command():
+        """Rebuild rating_sum, rating_count and rating_score for every place from its reviews."""
+        from app.services.review_service import recompute_place_ratings
+        click.echo(f"Recomputed ratings for {recompute_place_ratings()} places")
+
+    @app.cli.command("create-playdate-partitions")
+    @click.option("--months-ahead", type=int, default=None, help="Months after this one to create (default PLAYDATE_PARTITION_MONTHS_AHEAD).")
+    def create_playdate_partitions_command(months_ahead):
+        """Create the monthly playdates partitions for this month and the months ahead."""
+        from app.services.partition_service import create_partitions
+        created = create_partitions(months_ahead)
+        if created is None:
+            click.echo("playdates is not partitioned (PostgreSQL with partition_playdates.sql only); nothing to do")
+        else:
+            click.echo(f"Created {len(created)} playdate partitions{': ' + ', '.join(created) if created else ''}")
+
+    @app.cli.command("archive-playdates")
+    @click.option("--older-than-months", type=int, default=None, help="Keep this many past months live (default PLAYDATE_ARCHIVE_AFTER_MONTHS).")
+    def archive_playdates_command(older_than_months):
+        """Move old monthly playdates partitions into playdates_archive."""
+        from app.services.partition_service import archive_partitions
+        result = archive_partitions(older_than_months)
+        if result is None:
+            click.echo("playdates is not partitioned (PostgreSQL with partition_playdates.sql only); nothing to do")
+            return
+        archived, unfinished = result
+        click.echo(f"Archived {len(archived)} playdate partitions{': ' + ', '.join(archived) if archived else ''}")
+        if unfinished:
+            click.echo(f"Kept {len(unfinished)} partitions with pending or accepted playdates: {', '.join(unfinished)}")
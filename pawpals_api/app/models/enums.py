@@ -0,0 +1,48 @@
+"""
+Allowed values for Dog.size, Place.type and Playdate.status.
+
+This module is the single source of truth for these values. The columns are bound
+to the PostgreSQL enum types created by create_enums.sql (keep the two in step),
+and every write passes through normalize(): it trims and lowercases the value and
+maps known variant spellings ("Canceled" -> "cancelled"). Anything else raises
+InvalidChoice, which the app turns into a 400 response.
+"""
+
+from sqlalchemy.dialects.postgresql import ENUM
+
+DOG_SIZES = ("small", "medium", "large")
+PLACE_TYPES = ("park", "cafe", "hotel", "beach", "restaurant", "store", "other")
+PLAYDATE_STATUSES = ("pending", "accepted", "declined", "cancelled", "completed")
+
+# Variant spellings accepted on input, stored as the canonical value
+ALIASES = {
+    "canceled": "cancelled",  # create_enums.sql used this spelling before
+}
+
+
+class InvalidChoice(ValueError):
+    def __init__(self, field, value, choices):
+        self.field = field
+        super().__init__(f"Invalid {field} '{value}', expected one of: {', '.join(choices)}")
+
+
+def normalize(field, value, choices):
+    """Canonical form of value, or InvalidChoice. None passes through (nullable columns decide)."""
+    if value is None:
+        return None
+    canonical = str(value).strip().lower()
+    canonical = ALIASES.get(canonical, canonical)
+    if canonical not in choices:
+        raise InvalidChoice(field, value, choices)
+    return canonical
+
+
+def enum_type(name, choices):
+    # create_type=False: the types are created by create_enums.sql, not by create_all() or migrations.
+    # Other databases (the SQLite benchmark stand-in) store a VARCHAR.
+    return ENUM(*choices, name=name, create_type=False, validate_strings=True)
+
+
+DogSize = enum_type("dog_size_enum", DOG_SIZES)
+PlaceType = enum_type("place_type_enum", PLACE_TYPES)
+PlaydateStatus = enum_type("playdate_status_enum", PLAYDATE_STATUSES)
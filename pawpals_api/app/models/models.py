@@ -1,26 +1,66 @@
 from app import db
+from flask import current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid # For generating UUIDs if not handled by DB default directly in model
+from app.utils.media import image_urls
 from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+from sqlalchemy.dialects.sqlite import DATETIME as SQLiteDateTime
+from sqlalchemy.orm import Session, validates, with_loader_criteria
+from app.models.enums import (
+    DOG_SIZES, PLACE_TYPES, PLAYDATE_STATUSES, DogSize, PlaceType, PlaydateStatus, normalize,
+)
 
-# Enum Types (mirroring PostgreSQL ENUMs, can be handled by SQLAlchemy if needed or validated at app level)
-# For simplicity, we'll use string fields and validate them in routes or services if not using SQLAlchemy-Utils for ENUMs.
+class GUID(db.TypeDecorator):
+    """PostgreSQL UUID that also accepts string ids (e.g. the JWT identity), on any backend."""
+    impl = UUID(as_uuid=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return uuid.UUID(value)
+        return value
+
+# PostgreSQL types with a plain JSON stand-in so the schema also builds on SQLite (benchmarks, local runs)
+TextArray = ARRAY(db.Text).with_variant(db.JSON, "sqlite")
+JSONDocument = JSONB().with_variant(db.JSON, "sqlite")
+# Server-stamped times. SQLite's CURRENT_TIMESTAMP has no fraction, so store bound values the same way
+# there, or keyset comparisons against them (e.g. sync cursors) would compare mismatched text.
+Timestamp = db.DateTime().with_variant(
+    SQLiteDateTime(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"), "sqlite"
+)
+
+# to_dict() returns UUIDs and datetimes as-is; the app's JSON provider
+# (app/utils/json_provider.py) renders them as strings and ISO 8601 timestamps.
+# User, Dog and Place take the view's media_links() (app/utils/media.py) to build their image URLs.
+
+# size, type and status are native PostgreSQL enums; allowed values and normalization live in app/models/enums.py.
+
+def _soft_deleted_index(table):
+    # Partial: only the few rows awaiting the purge are indexed, which is all the soft-delete filters and the purge look up
+    return db.Index(
+        f"ix_{table}_deleted_at", "deleted_at",
+        postgresql_where=db.text("deleted_at IS NOT NULL"), sqlite_where=db.text("deleted_at IS NOT NULL"),
+    )
 
 class User(db.Model):
     __tablename__ = "users"
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
     name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.Text, nullable=False)
     location_latitude = db.Column(db.Float, nullable=True)
     location_longitude = db.Column(db.Float, nullable=True)
     profile_image_url = db.Column(db.String(2048), nullable=True)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, server_default=db.func.now(), onupdate=db.func.now(), index=True)
+    deleted_at = db.Column(Timestamp, nullable=True) # Soft-deleted: hidden, removed later by the purge job
+
+    __table_args__ = (_soft_deleted_index("users"),)
 
-    dogs = db.relationship("Dog", backref="owner", lazy="dynamic", cascade="all, delete-orphan")
+    # passive_deletes: the database's ON DELETE rules remove children, so deleting doesn't load them first
+    dogs = db.relationship("Dog", backref="owner", lazy="dynamic", cascade="all, delete-orphan", passive_deletes=True)
     # Relationship for places added by user
-    added_places = db.relationship("Place", backref="adder", lazy="dynamic", foreign_keys="Place.added_by_user_id")
+    added_places = db.relationship("Place", backref="adder", lazy="dynamic", foreign_keys="Place.added_by_user_id", passive_deletes=True)
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -28,55 +68,64 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-    def to_dict(self):
+    def to_dict(self, media):
         return {
-            "id": str(self.id),
+            "id": self.id,
             "name": self.name,
             "email": self.email,
             "location_latitude": self.location_latitude,
             "location_longitude": self.location_longitude,
             "profile_image_url": self.profile_image_url,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "profile_image_urls": image_urls(self.profile_image_url, media), # Per size, e.g. "thumb" for avatars
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
 
 class Dog(db.Model):
     __tablename__ = "dogs"
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=False, index=True)
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(GUID, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     breed = db.Column(db.String(100), nullable=True)
     age_years = db.Column(db.Integer, nullable=True)
-    size = db.Column(db.String(50), nullable=True)  # Corresponds to dog_size_enum
-    temperament = db.Column(ARRAY(db.Text), nullable=True)
+    size = db.Column(DogSize, nullable=True)
+    temperament = db.Column(TextArray, nullable=True)
     profile_image_url = db.Column(db.String(2048), nullable=True)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, server_default=db.func.now(), onupdate=db.func.now(), index=True)
+    deleted_at = db.Column(Timestamp, nullable=True) # Soft-deleted: hidden, removed later by the purge job
+
+    __table_args__ = (_soft_deleted_index("dogs"),)
 
     # Relationships for playdates
-    playdates_as_dog1 = db.relationship("Playdate", foreign_keys="Playdate.dog1_id", backref="dog1", lazy="dynamic", cascade="all, delete-orphan")
-    playdates_as_dog2 = db.relationship("Playdate", foreign_keys="Playdate.dog2_id", backref="dog2", lazy="dynamic", cascade="all, delete-orphan")
-    playdates_requested = db.relationship("Playdate", foreign_keys="Playdate.requester_dog_id", backref="requester_dog", lazy="dynamic")
+    playdates_as_dog1 = db.relationship("Playdate", foreign_keys="Playdate.dog1_id", backref="dog1", lazy="dynamic", cascade="all, delete-orphan", passive_deletes=True)
+    playdates_as_dog2 = db.relationship("Playdate", foreign_keys="Playdate.dog2_id", backref="dog2", lazy="dynamic", cascade="all, delete-orphan", passive_deletes=True)
+    playdates_requested = db.relationship("Playdate", foreign_keys="Playdate.requester_dog_id", backref="requester_dog", lazy="dynamic", passive_deletes=True)
 
-    def to_dict(self):
+    @validates("size")
+    def validate_size(self, key, value):
+        return normalize("size", value, DOG_SIZES)
+
+    def to_dict(self, media):
         return {
-            "id": str(self.id),
-            "user_id": str(self.user_id),
+            "id": self.id,
+            "user_id": self.user_id,
             "name": self.name,
             "breed": self.breed,
             "age_years": self.age_years,
             "size": self.size,
             "temperament": self.temperament if self.temperament else [],
             "profile_image_url": self.profile_image_url,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "profile_image_urls": image_urls(self.profile_image_url, media),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
 
 class Place(db.Model):
     __tablename__ = "places"
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
     name = db.Column(db.String(255), nullable=False)
-    type = db.Column(db.String(50), nullable=False, index=True) # Corresponds to place_type_enum
+    type = db.Column(PlaceType, nullable=False, index=True)
     address_street = db.Column(db.String(255), nullable=True)
     address_city = db.Column(db.String(100), nullable=True)
     address_state_province = db.Column(db.String(100), nullable=True)
@@ -85,21 +134,34 @@ class Place(db.Model):
     location_latitude = db.Column(db.Float, nullable=False)
     location_longitude = db.Column(db.Float, nullable=False)
     description = db.Column(db.Text, nullable=True)
-    rating = db.Column(db.Numeric(2, 1), nullable=True)
+    # Kept up to date by app/services/review_service.py in the same transaction as each review write
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Bayesian average: (REVIEW_PRIOR_WEIGHT * REVIEW_PRIOR_MEAN + rating_sum) / (REVIEW_PRIOR_WEIGHT + rating_count)
+    rating_score = db.Column(db.Float, nullable=False, default=lambda: current_app.config["REVIEW_PRIOR_MEAN"], server_default="3.0", index=True)
     phone_number = db.Column(db.String(30), nullable=True)
     website_url = db.Column(db.String(2048), nullable=True)
-    hours_of_operation = db.Column(JSONB, nullable=True)
-    images_urls = db.Column(ARRAY(db.Text), nullable=True)
-    added_by_user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=True)
+    hours_of_operation = db.Column(JSONDocument, nullable=True)
+    images_urls = db.Column(TextArray, nullable=True)
+    added_by_user_id = db.Column(GUID, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     is_verified = db.Column(db.Boolean, default=False, nullable=False)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, server_default=db.func.now(), onupdate=db.func.now(), index=True)
+
+    __table_args__ = (
+        db.Index("ix_places_type_rating_score", "type", "rating_score"), # ?category=...&sort=top_rated
+        db.Index("ix_places_location", "location_latitude", "location_longitude"), # /places/nearby bounding box
+    )
+
+    @validates("type")
+    def validate_type(self, key, value):
+        return normalize("type", value, PLACE_TYPES)
 
     # If using PostGIS, you would add a Geometry column here
     # geom = db.Column(Geometry(geometry_type='POINT', srid=4326), nullable=True)
-    def to_dict(self):
+    def to_dict(self, media):
         return {
-            "id": str(self.id),
+            "id": self.id,
             "name": self.name,
             "type": self.type,
             "address_street": self.address_street,
@@ -110,45 +172,174 @@ class Place(db.Model):
             "location_latitude": self.location_latitude,
             "location_longitude": self.location_longitude,
             "description": self.description,
-            "rating": float(self.rating) if self.rating is not None else None,
+            "rating": round(self.rating_sum / self.rating_count, 1) if self.rating_count else None, # Plain average
+            "rating_count": self.rating_count,
+            "rating_score": self.rating_score,
             "phone_number": self.phone_number,
             "website_url": self.website_url,
             "hours_of_operation": self.hours_of_operation,
             "images_urls": self.images_urls if self.images_urls else [],
-            "added_by_user_id": str(self.added_by_user_id) if self.added_by_user_id else None,
+            "images": [image_urls(url, media) for url in self.images_urls or []],
+            "added_by_user_id": self.added_by_user_id,
             "is_verified": self.is_verified,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
 
 class Playdate(db.Model):
+    # On PostgreSQL the table is range-partitioned by month on playdate_time (partition_playdates.sql),
+    # which must then be part of the primary key. Look playdates up with filter_by(id=...), not get().
+    # Without playdate_time that lookup can't be pruned: it probes the primary-key index of every partition,
+    # one per live month plus the default, which is why archive-playdates keeps the month count down.
     __tablename__ = "playdates"
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    dog1_id = db.Column(UUID(as_uuid=True), db.ForeignKey("dogs.id"), nullable=False, index=True)
-    dog2_id = db.Column(UUID(as_uuid=True), db.ForeignKey("dogs.id"), nullable=False, index=True)
-    requester_dog_id = db.Column(UUID(as_uuid=True), db.ForeignKey("dogs.id"), nullable=False)
-    playdate_time = db.Column(db.DateTime, nullable=False)
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
+    dog1_id = db.Column(GUID, db.ForeignKey("dogs.id", ondelete="CASCADE"), nullable=False, index=True)
+    dog2_id = db.Column(GUID, db.ForeignKey("dogs.id", ondelete="CASCADE"), nullable=False, index=True)
+    requester_dog_id = db.Column(GUID, db.ForeignKey("dogs.id", ondelete="CASCADE"), nullable=False)
+    playdate_time = db.Column(db.DateTime, primary_key=True)
     location_description = db.Column(db.Text, nullable=True)
     location_latitude = db.Column(db.Float, nullable=True)
     location_longitude = db.Column(db.Float, nullable=True)
-    status = db.Column(db.String(50), default="pending", nullable=False, index=True) # Corresponds to playdate_status_enum
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    status = db.Column(PlaydateStatus, default="pending", nullable=False, index=True)
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, server_default=db.func.now(), onupdate=db.func.now(), index=True)
 
     __table_args__ = (db.CheckConstraint("dog1_id != dog2_id", name="check_different_dogs_in_playdate"),)
 
+    @validates("status")
+    def validate_status(self, key, value):
+        return normalize("status", value, PLAYDATE_STATUSES)
+
     def to_dict(self):
         return {
-            "id": str(self.id),
-            "dog1_id": str(self.dog1_id),
-            "dog2_id": str(self.dog2_id),
-            "requester_dog_id": str(self.requester_dog_id),
-            "playdate_time": self.playdate_time.isoformat() if self.playdate_time else None,
+            "id": self.id,
+            "dog1_id": self.dog1_id,
+            "dog2_id": self.dog2_id,
+            "requester_dog_id": self.requester_dog_id,
+            "playdate_time": self.playdate_time,
             "location_description": self.location_description,
             "location_latitude": self.location_latitude,
             "location_longitude": self.location_longitude,
             "status": self.status,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
 
+
+class PlaydateArchive(db.Model):
+    """
+    Playdates from months moved out of the playdates table by `flask archive-playdates`, all in a
+    final status. Read-only; served by GET /api/playdates/history. Created by partition_playdates.sql
+    (partitioned like playdates), so migrations leave it alone.
+    """
+    __tablename__ = "playdates_archive"
+    id = db.Column(GUID, primary_key=True)
+    dog1_id = db.Column(GUID, db.ForeignKey("dogs.id", ondelete="CASCADE"), nullable=False, index=True)
+    dog2_id = db.Column(GUID, db.ForeignKey("dogs.id", ondelete="CASCADE"), nullable=False, index=True)
+    requester_dog_id = db.Column(GUID, db.ForeignKey("dogs.id", ondelete="CASCADE"), nullable=False)
+    playdate_time = db.Column(db.DateTime, primary_key=True)
+    location_description = db.Column(db.Text, nullable=True)
+    location_latitude = db.Column(db.Float, nullable=True)
+    location_longitude = db.Column(db.Float, nullable=True)
+    status = db.Column(PlaydateStatus, nullable=False)
+    created_at = db.Column(Timestamp)
+    updated_at = db.Column(Timestamp)
+
+    to_dict = Playdate.to_dict # Same shape as a live playdate
+
+
+class Review(db.Model):
+    __tablename__ = "reviews"
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
+    place_id = db.Column(GUID, db.ForeignKey("places.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(GUID, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    rating = db.Column(db.SmallInteger, nullable=False) # 1 to 5
+    comment = db.Column(db.Text, nullable=True)
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, server_default=db.func.now(), onupdate=db.func.now())
+
+    user = db.relationship("User", lazy="joined") # Reviews are listed with the author's name
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "place_id", name="uq_reviews_user_id_place_id"), # One review per user and place
+        db.CheckConstraint("rating BETWEEN 1 AND 5", name="check_review_rating_range"),
+        db.Index("ix_reviews_place_id_created_at", "place_id", "created_at"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "place_id": self.place_id,
+            "user_id": self.user_id,
+            "user_name": self.user.name if self.user else None,
+            "rating": self.rating,
+            "comment": self.comment,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class Tombstone(db.Model):
+    """Records a deleted row so GET /api/sync can tell clients to drop it."""
+    __tablename__ = "tombstones"
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity_type = db.Column(db.String(20), nullable=False) # "dog", "place" or "playdate"
+    entity_id = db.Column(GUID, nullable=False)
+    user_id = db.Column(GUID, nullable=True) # User who should hear about it; NULL means everyone (places)
+    deleted_at = db.Column(Timestamp, server_default=db.func.now(), nullable=False, index=True)
+
+    __table_args__ = (db.Index("ix_tombstones_user_id_deleted_at", "user_id", "deleted_at"),)
+
+
+class IdempotencyKey(db.Model):
+    """The stored outcome of a POST sent with an Idempotency-Key header (see app/utils/idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    scope = db.Column(db.String(64), nullable=False) # Who sent it: user ID, or a hash of the credentials
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False) # SHA-256 of method, path and body
+    status = db.Column(db.String(20), nullable=False, default="in_progress") # "in_progress" or "completed"
+    locked_at = db.Column(db.DateTime, nullable=False) # When the in-flight request claimed the key
+    response_status = db.Column(db.Integer, nullable=True)
+    response_mimetype = db.Column(db.String(100), nullable=True)
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (db.UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),)
+
+
+# Soft-deleted users and dogs, the playdates of soft-deleted dogs and soft-deleted users' reviews are left out of every ORM
+# query until the purge job (app/services/purge_service.py) removes them. Opt out per statement
+# with .execution_options(include_deleted=True). Core statements on the tables are not filtered.
+#
+# Playdates and reviews are filtered with NOT EXISTS on the soft-deleted owner, which PostgreSQL runs as an anti-join
+# against the partial deleted_at indexes, so the cost stays flat however many rows await the purge (a NOT IN subquery
+# turns into a per-row scan once the deleted set outgrows work_mem). Aliased, so the subquery never correlates with a
+# dogs or users table the query itself selects from.
+_deleted_dogs = Dog.__table__.alias("deleted_dogs")
+_deleted_users = User.__table__.alias("deleted_users")
+
+
+def _no_deleted_dog(dog_id):
+    return ~db.exists().where(_deleted_dogs.c.id == dog_id, _deleted_dogs.c.deleted_at.isnot(None))
+
+
+def _no_deleted_user(user_id):
+    return ~db.exists().where(_deleted_users.c.id == user_id, _deleted_users.c.deleted_at.isnot(None))
+
+
+@db.event.listens_for(Session, "do_orm_execute")
+def _hide_soft_deleted(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.execution_options.get("include_deleted", False):
+        return
+    orm_execute_state.statement = orm_execute_state.statement.options(
+        with_loader_criteria(User, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        with_loader_criteria(Dog, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        with_loader_criteria(
+            Playdate, lambda cls: _no_deleted_dog(cls.dog1_id) & _no_deleted_dog(cls.dog2_id), include_aliases=True
+        ),
+        with_loader_criteria(
+            PlaydateArchive, lambda cls: _no_deleted_dog(cls.dog1_id) & _no_deleted_dog(cls.dog2_id), include_aliases=True
+        ),
+        with_loader_criteria(Review, lambda cls: _no_deleted_user(cls.user_id), include_aliases=True),
+    )
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app import db, jwt
-from app.models.models import User
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from app.models.models import Dog, User
+from app.services.purge_service import schedule_purge
+from app.utils.auth import jwt_required
+from app.utils.media import media_links
+from flask_jwt_extended import create_access_token, get_jwt_identity
 from datetime import timedelta
 
 bp = Blueprint("auth", __name__)
@@ -21,12 +24,13 @@ def register():
     if data.get("location_latitude") and data.get("location_longitude"):
         user.location_latitude = data["location_latitude"]
         user.location_longitude = data["location_longitude"]
+    user.profile_image_url = data.get("profile_image_url") # e.g. the "url" returned by POST /api/media
     
     db.session.add(user)
     db.session.commit()
 
     access_token = create_access_token(identity=str(user.id), expires_delta=timedelta(days=7))
-    return jsonify({"message": "User registered successfully", "token": access_token, "user": user.to_dict()}), 201
+    return jsonify({"message": "User registered successfully", "token": access_token, "user": user.to_dict(media_links())}), 201
 
 @bp.route("/login", methods=["POST"])
 def login():
@@ -40,7 +44,7 @@ def login():
         return jsonify({"message": "Invalid credentials"}), 401
 
     access_token = create_access_token(identity=str(user.id), expires_delta=timedelta(days=7))
-    return jsonify({"token": access_token, "user": user.to_dict()}), 200
+    return jsonify({"token": access_token, "user": user.to_dict(media_links())}), 200
 
 @bp.route("/forgot-password", methods=["POST"])
 def forgot_password():
@@ -70,7 +74,24 @@ def get_me():
     user = User.query.get(current_user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
-    return jsonify(user.to_dict()), 200
+    return jsonify(user.to_dict(media_links())), 200
+
+@bp.route("/me", methods=["DELETE"])
+@jwt_required()
+def delete_me():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+
+    # Soft delete: hides the account, its dogs and their playdates in two UPDATEs however big the
+    # history is. The purge job hard-deletes the rows in the background.
+    Dog.query.filter_by(user_id=user.id).update({"deleted_at": db.func.now()}, synchronize_session=False)
+    user.deleted_at = db.func.now()
+    user.email = f"deleted-{user.id}" # Frees the address for a new registration right away
+    db.session.commit()
+    schedule_purge(current_app._get_current_object())
+    return jsonify({"message": "Account deleted successfully"}), 200
 
 # Example of a protected route
 @bp.route("/protected", methods=["GET"])
@@ -0,0 +1,162 @@
+"""
+POST /api/batch runs several API calls in one round trip.
+
+    {"requests": [
+        {"id": "me", "method": "GET", "path": "/api/auth/me"},
+        {"id": "dogs", "method": "GET", "path": "/api/dogs"},
+        {"method": "POST", "path": "/api/dogs", "body": {"name": "Rex"}}
+    ]}
+
+returns {"responses": [{"id": ..., "status": ..., "body": ...}, ...]} in request order.
+
+The batch verifies the caller's token once. Sub-requests run as that caller (an
+Authorization header in a sub-request is ignored) and each view checks the verified
+claims against its own @jwt_required(...) options, so fresh, refresh and optional
+behave as in a direct call without decoding the token again (see app/utils/auth.py).
+Writes run in order on the batch's own DB session. Runs of consecutive GETs between
+them are independent and run concurrently, each thread with its own session.
+
+Sub-requests skip the app's before/after request hooks; the batch as a whole goes
+through them. So an Idempotency-Key belongs on the batch, which is then replayed as
+a whole, and is rejected on a sub-request rather than silently ignored.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, g, jsonify, request
+from flask_jwt_extended import jwt_required
+from werkzeug.exceptions import HTTPException
+
+from app import db
+from app.utils.auth import VERIFIED_JWT_KEY, verified_jwt
+from app.utils.db_routing import STICKY_HEADER, sticky_marker
+from app.utils.idempotency import HEADER as IDEMPOTENCY_HEADER
+from app.utils.json_provider import dumps_bytes
+
+bp = Blueprint("batch", __name__)
+
+ALLOWED_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+_executors = {}  # max_workers -> thread pool, so each BATCH_MAX_WORKERS setting gets a pool of that size
+_executors_lock = threading.Lock()
+
+
+def _get_executor(max_workers):
+    with _executors_lock:
+        if max_workers not in _executors:
+            _executors[max_workers] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch")
+        return _executors[max_workers]
+
+
+def _error(status, message):
+    return status, dumps_bytes({"message": message})
+
+
+def _run_view(app, spec, verified, marker=None):
+    """Dispatch one sub-request in a request context of its own and return (status, JSON bytes)."""
+    # Sub-requests act as the batch's caller, never as someone else
+    headers = {key: value for key, value in (spec.get("headers") or {}).items() if key.lower() != "authorization"}
+    if marker:
+        headers[STICKY_HEADER] = marker  # The batch's last-write marker, so sub-requests see the client's writes
+    with app.test_request_context(
+        spec["path"], method=spec["method"], json=spec.get("body"), headers=headers,
+        environ_overrides={VERIFIED_JWT_KEY: verified},
+    ):
+        if request.routing_exception is not None:
+            exc = request.routing_exception
+            return _error(getattr(exc, "code", 404), getattr(exc, "description", "Not found"))
+
+        view = app.view_functions[request.url_rule.endpoint]
+        try:
+            response = app.make_response(view(**request.view_args))
+            body = response.get_data()  # Also drains streamed responses while the context is live
+        except HTTPException as e:
+            return _error(e.code, e.description)
+        except Exception as e:
+            try:
+                # The app's error handlers (e.g. InvalidChoice -> 400) apply to sub-requests too
+                response = app.make_response(app.handle_user_exception(e))
+                body = response.get_data()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception(f"Batch sub-request failed: {spec['method']} {spec['path']}")
+                return _error(500, "Internal server error")
+
+        if response.mimetype != "application/json":
+            body = dumps_bytes(body.decode("utf-8", errors="replace"))
+        return response.status_code, body.strip() or b"null"
+
+
+def _run_in_thread(app, spec, verified, db_wrote, marker):
+    # A new app context gives this thread its own DB session
+    with app.app_context():
+        if db_wrote:
+            g.db_wrote = True  # Keep reads on the primary after earlier writes in the batch
+        return _run_view(app, spec, verified, marker)
+
+
+def _validate(subrequests, max_requests):
+    if not isinstance(subrequests, list) or not subrequests:
+        return "'requests' must be a non-empty list"
+    if len(subrequests) > max_requests:
+        return f"A batch can contain at most {max_requests} requests"
+    for index, spec in enumerate(subrequests):
+        if not isinstance(spec, dict) or not isinstance(spec.get("path"), str):
+            return f"Request {index} must be an object with a 'path'"
+        spec["method"] = str(spec.get("method", "GET")).upper()
+        if spec["method"] not in ALLOWED_METHODS:
+            return f"Request {index} has an unsupported method"
+        headers = spec.get("headers")
+        if headers is not None and (
+            not isinstance(headers, dict) or not all(isinstance(value, str) for value in headers.values())
+        ):
+            return f"Request {index} has invalid 'headers': expected an object of strings"
+        if any(name.lower() == IDEMPOTENCY_HEADER.lower() for name in headers or ()):
+            return f"Request {index} has an {IDEMPOTENCY_HEADER}: send it on the batch instead"
+        if not spec["path"].startswith("/api/") or spec["path"].split("?")[0].rstrip("/") == "/api/batch":
+            return f"Request {index} must target an /api/ endpoint other than /api/batch"
+    return None
+
+
+@bp.route("/batch", methods=["POST"])
+# The one verification for the whole batch: optional so public endpoints can be batched without a token, and
+# either token type, since each sub-request's view checks the type it needs
+@jwt_required(optional=True, verify_type=False)
+def batch():
+    data = request.get_json(silent=True)
+    subrequests = data.get("requests") if isinstance(data, dict) else None
+    error = _validate(subrequests, current_app.config["BATCH_MAX_REQUESTS"])
+    if error:
+        return jsonify({"message": error}), 400
+
+    app = current_app._get_current_object()
+    verified = verified_jwt()
+    marker = sticky_marker()
+    max_workers = current_app.config["BATCH_MAX_WORKERS"]
+    results = [None] * len(subrequests)
+
+    index = 0
+    while index < len(subrequests):
+        # Consecutive GETs form a group that can run concurrently
+        end = index
+        while end < len(subrequests) and subrequests[end]["method"] == "GET":
+            end += 1
+        if end - index > 1 and max_workers > 1:
+            executor = _get_executor(max_workers)
+            futures = [
+                executor.submit(_run_in_thread, app, subrequests[i], verified, g.get("db_wrote", False), marker)
+                for i in range(index, end)
+            ]
+            for i, future in zip(range(index, end), futures):
+                results[i] = future.result()
+            index = end
+        else:
+            results[index] = _run_view(app, subrequests[index], verified, marker)
+            index += 1
+
+    # Splice the sub-responses' JSON bytes in directly instead of decoding and re-encoding them
+    parts = []
+    for spec, (status, body) in zip(subrequests, results):
+        parts.append(b'{"id":' + dumps_bytes(spec.get("id")) + b',"status":' + str(status).encode() + b',"body":' + body + b"}")
+    return current_app.response_class(b'{"responses":[' + b",".join(parts) + b"]}\n", mimetype="application/json")
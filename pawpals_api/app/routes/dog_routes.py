@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app import db
 from app.models.models import Dog, User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.purge_service import schedule_purge
+from app.services.sync_service import record_deletion
+from app.utils.auth import jwt_required
+from app.utils.media import media_links
+from flask_jwt_extended import get_jwt_identity
 import uuid
 
 bp = Blueprint("dogs", __name__)
@@ -29,7 +33,7 @@ def create_dog():
     )
     db.session.add(new_dog)
     db.session.commit()
-    return jsonify(new_dog.to_dict()), 201
+    return jsonify(new_dog.to_dict(media_links())), 201
 
 @bp.route("/dogs", methods=["GET"])
 @jwt_required()
@@ -40,7 +44,8 @@ def get_user_dogs():
         return jsonify({"message": "User not found"}), 404
     
     dogs = Dog.query.filter_by(user_id=user.id).all()
-    return jsonify([dog.to_dict() for dog in dogs]), 200
+    media = media_links()
+    return jsonify([dog.to_dict(media) for dog in dogs]), 200
 
 @bp.route("/dogs/<dog_id>", methods=["GET"])
 @jwt_required()
@@ -58,7 +63,7 @@ def get_dog(dog_id):
              return jsonify({"message": "Dog not found"}), 404
         return jsonify({"message": "Unauthorized to view this dog"}), 403
         
-    return jsonify(dog.to_dict()), 200
+    return jsonify(dog.to_dict(media_links())), 200
 
 @bp.route("/dogs/<dog_id>", methods=["PUT"])
 @jwt_required()
@@ -84,7 +89,7 @@ def update_dog(dog_id):
     dog.profile_image_url = data.get("profile_image_url", dog.profile_image_url)
     
     db.session.commit()
-    return jsonify(dog.to_dict()), 200
+    return jsonify(dog.to_dict(media_links())), 200
 
 @bp.route("/dogs/<dog_id>", methods=["DELETE"])
 @jwt_required()
@@ -101,7 +106,11 @@ def delete_dog(dog_id):
              return jsonify({"message": "Dog not found"}), 404
         return jsonify({"message": "Unauthorized to delete this dog"}), 403
 
-    db.session.delete(dog)
+    # Soft delete: the dog and its playdates are hidden now, and the purge job removes them in batches
+    # (tombstoning the playdates for the other owners as it goes)
+    dog.deleted_at = db.func.now()
+    record_deletion("dog", dog.id, [dog.user_id])
     db.session.commit()
+    schedule_purge(current_app._get_current_object())
     return jsonify({"message": "Dog deleted successfully"}), 200
 
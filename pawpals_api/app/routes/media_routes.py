@@ -0,0 +1,60 @@
+import os
+from flask import Blueprint, current_app, request, jsonify, redirect, send_file
+from app.utils.auth import jwt_required
+from app.utils.idempotency import idempotency_exempt
+from app.utils.media import (
+    ORIGINAL, UploadTooLarge, image_urls, is_media_id, media_links, media_url, schedule_thumbnails, sniff_mimetype,
+    store_upload, variant_path,
+)
+
+bp = Blueprint("media", __name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+@bp.route("/api/media", methods=["POST"])
+@idempotency_exempt # Content-addressed: re-uploading the same bytes is already a no-op
+@jwt_required()
+def upload_image():
+    # Accepts multipart/form-data with a "file" field, or the raw image as the request body
+    max_bytes = current_app.config["MEDIA_MAX_UPLOAD_BYTES"]
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({"message": f"Images can be at most {max_bytes} bytes"}), 413
+    upload = request.files.get("file")
+    try:
+        sha, mimetype, created = store_upload(upload.stream if upload else request.stream, max_bytes)
+    except UploadTooLarge:
+        return jsonify({"message": f"Images can be at most {max_bytes} bytes"}), 413
+    if mimetype is None:
+        return jsonify({"message": "Unsupported image format, use JPEG, PNG, GIF or WebP"}), 415
+
+    schedule_thumbnails(sha)
+    url = media_url(sha)
+    # Store "url" in profile_image_url / images_urls; responses then list every size
+    return jsonify({"id": sha, "url": url, "urls": image_urls(url, media_links())}), 201 if created else 200
+
+@bp.route("/media/<sha>/<size>", methods=["GET"])
+def get_image(sha, size):
+    if not is_media_id(sha) or (size != ORIGINAL and size not in current_app.config["MEDIA_IMAGE_SIZES"]):
+        return jsonify({"message": "Image not found"}), 404
+
+    path = variant_path(sha, size)
+    if not os.path.exists(path):
+        if size != ORIGINAL and os.path.exists(variant_path(sha, ORIGINAL)):
+            # Thumbnail not rendered (yet): fall back to the original, without caching the redirect.
+            # Re-queue it too, in case it was lost (e.g. the worker restarted before rendering it).
+            schedule_thumbnails(sha)
+            response = redirect(media_url(sha), 302)
+            response.headers["Cache-Control"] = "no-store"
+            return response
+        return jsonify({"message": "Image not found"}), 404
+
+    if size == ORIGINAL:
+        with open(path, "rb") as f:
+            mimetype = sniff_mimetype(f.read(16))
+    else:
+        mimetype = "image/jpeg"
+    # The URL names the content's hash, so the bytes behind it never change
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
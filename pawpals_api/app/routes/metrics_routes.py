@@ -0,0 +1,27 @@
+import hmac
+import ipaddress
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.utils.metrics import REGISTRY
+
+bp = Blueprint("metrics", __name__)
+
+def _scraper_allowed():
+    """A scraper needs either METRICS_TOKEN as a bearer token or an address in METRICS_ALLOWED_IPS."""
+    token = current_app.config["METRICS_TOKEN"]
+    auth = request.headers.get("Authorization", "")
+    if token and hmac.compare_digest(auth.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+        return True
+    try:
+        address = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    # remote_addr is the direct peer: behind a proxy that is the proxy, so prefer the token there
+    return any(address in ipaddress.ip_network(network, strict=False) for network in current_app.config["METRICS_ALLOWED_IPS"])
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    if not _scraper_allowed():
+        return jsonify({"message": "Forbidden"}), 403
+    # Prometheus text exposition format
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -1,10 +1,16 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models.models import Place, User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.enums import PLACE_TYPES, normalize
+from app.utils.auth import jwt_required
+from flask_jwt_extended import get_jwt_identity
+from app.utils.media import media_links
+from app.utils.streaming import stream_json_array, stream_query
+from app.services.sync_service import record_deletion
+import itertools
+import math
 import uuid
 import requests # For Nominatim
-from sqlalchemy import func # For ST_DWithin if using PostGIS
 
 bp = Blueprint("places", __name__)
 
@@ -28,6 +34,43 @@ def geocode_address_nominatim(street, city, postal_code, country):
         print(f"Error parsing Nominatim response: {e}")
     return None, None
 
+def sort_places(query):
+    """Apply ?sort=; returns None for an unknown value."""
+    sort = request.args.get("sort")
+    if sort is None:
+        return query
+    if sort == "top_rated":
+        # Served by the rating_score indexes; nothing is aggregated at query time
+        return query.order_by(Place.rating_score.desc(), Place.id)
+    return None
+
+EARTH_RADIUS_KM = 6371
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    R = EARTH_RADIUS_KM
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlon = math.radians(lon2) - math.radians(lon1)
+    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Latitude and longitude ranges holding every point within radius_km of (lat, lon), on the sphere haversine_km uses.
+    The longitude range is None (unbounded) when the circle reaches a pole or crosses the antimeridian.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    lat_range = (lat - math.degrees(angular), lat + math.degrees(angular))
+    if lat_range[0] <= -90 or lat_range[1] >= 90:
+        return lat_range, None
+    # Widest at the circle's tangent points, not at the center's latitude
+    lon_delta = math.degrees(math.asin(math.sin(angular) / math.cos(math.radians(lat))))
+    if lon - lon_delta < -180 or lon + lon_delta > 180:
+        return lat_range, None
+    return lat_range, (lon - lon_delta, lon + lon_delta)
+
 @bp.route("/places", methods=["POST"])
 @jwt_required()
 def create_place():
@@ -72,7 +115,6 @@ def create_place():
         location_latitude=latitude,
         location_longitude=longitude,
         description=data.get("description"),
-        rating=data.get("rating"),
         phone_number=data.get("phone_number"),
         website_url=data.get("website_url"),
         hours_of_operation=data.get("hours_of_operation"), # Expects JSON
@@ -84,7 +126,7 @@ def create_place():
 
     db.session.add(new_place)
     db.session.commit()
-    return jsonify(new_place.to_dict()), 201
+    return jsonify(new_place.to_dict(media_links())), 201
 
 @bp.route("/places", methods=["GET"])
 def get_places(): # Publicly accessible, or add @jwt_required() if needed
@@ -92,14 +134,18 @@ def get_places(): # Publicly accessible, or add @jwt_required() if needed
     category = request.args.get("category")
     query = Place.query
     if category:
-        query = query.filter_by(type=category)
+        query = query.filter_by(type=normalize("category", category, PLACE_TYPES))
+    query = sort_places(query)
+    if query is None:
+        return jsonify({"message": "Invalid sort, use sort=top_rated"}), 400
     
     # Simple pagination example
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
     places_page = query.paginate(page=page, per_page=per_page, error_out=False)
     
-    places_data = [place.to_dict() for place in places_page.items]
+    media = media_links()
+    places_data = [place.to_dict(media) for place in places_page.items]
     return jsonify({
         "places": places_data,
         "total_pages": places_page.pages,
@@ -117,67 +163,34 @@ def get_nearby_places():
         return jsonify({"message": "Invalid latitude, longitude, or radius parameters"}), 400
 
     category = request.args.get("category")
+    limit = request.args.get("limit", type=int)
 
-    # Earth radius in kilometers
-    earth_radius_km = 6371
-    # Convert radius from km to degrees (approximate)
-    # 1 degree latitude is approx 111 km. For longitude, it varies.
-    # A more accurate way is to use ST_DWithin with PostGIS or Haversine formula.
-    # For simplicity with basic SQL, we use an approximate bounding box or a simpler distance calc.
-    
-    # Approximate bounding box (less accurate for larger distances or near poles)
-    # lat_diff = radius_km / 111.0
-    # lon_diff = radius_km / (111.0 * func.cos(func.radians(lat)))
-    # query = Place.query.filter(
-    #     Place.location_latitude.between(lat - lat_diff, lat + lat_diff),
-    #     Place.location_longitude.between(lon - lon_diff, lon + lon_diff)
-    # )
-
-    # Using Haversine formula in SQL (more complex to write directly in SQLAlchemy without specific DB functions)
-    # For PostgreSQL with PostGIS, you would use ST_DWithin:
-    # query = Place.query.filter(func.ST_DWithin(
-    #     Place.geom, # Assuming geom is a Geography type column
-    #     func.ST_MakePoint(lon, lat).cast(Geography()),
-    #     radius_km * 1000 # ST_DWithin expects meters
-    # ))
-    # If not using PostGIS, you might have to fetch more results and filter in Python, or use a complex SQL expression.
-
-    # Simplified approach: fetch all and filter in Python (NOT EFFICIENT FOR LARGE DATASETS)
-    # This is just a placeholder for a proper geospatial query.
-    # In a real app, use PostGIS ST_DWithin or a similar geospatial index query.
-    all_places = Place.query
+    # The bounding box turns the search into a range scan of ix_places_location, and haversine_km then drops the
+    # box's corners. With sort=top_rated the database picks between that range scan and walking the rating index,
+    # so the query stays bounded either way. (With PostGIS, ST_DWithin on a geography column would replace both.)
+    # Rows are read in batches and streamed out, so memory stays flat however many places match.
+    lat_range, lon_range = bounding_box(lat, lon, radius_km)
+    all_places = Place.query.filter(Place.location_latitude.between(*lat_range))
+    if lon_range is not None:
+        all_places = all_places.filter(Place.location_longitude.between(*lon_range))
     if category:
-        all_places = all_places.filter_by(type=category)
-    all_places = all_places.all()
-
-    nearby_places_list = []
-    for place in all_places:
-        if place.location_latitude is not None and place.location_longitude is not None:
-            # Haversine distance calculation (example)
-            R = 6371  # Radius of Earth in kilometers
-            dLat = func.radians(place.location_latitude - lat)
-            dLon = func.radians(place.location_longitude - lon)
-            a = (func.sin(dLat / 2) * func.sin(dLat / 2) +
-                 func.cos(func.radians(lat)) * func.cos(func.radians(place.location_latitude)) *
-                 func.sin(dLon / 2) * func.sin(dLon / 2))
-            c = 2 * func.atan2(func.sqrt(a), func.sqrt(1 - a))
-            distance = R * c
-            # This distance calculation is symbolic here, needs to be executed by DB or in Python
-            # For Python calculation:
-            import math
-            lat1_rad = math.radians(lat)
-            lon1_rad = math.radians(lon)
-            lat2_rad = math.radians(place.location_latitude)
-            lon2_rad = math.radians(place.location_longitude)
-            dlon = lon2_rad - lon1_rad
-            dlat = lat2_rad - lat1_rad
-            a_py = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
-            c_py = 2 * math.atan2(math.sqrt(a_py), math.sqrt(1 - a_py))
-            distance_py = R * c_py
-            if distance_py <= radius_km:
-                nearby_places_list.append(place.to_dict())
-    
-    return jsonify(nearby_places_list), 200
+        all_places = all_places.filter_by(type=normalize("category", category, PLACE_TYPES))
+    all_places = sort_places(all_places)
+    if all_places is None:
+        return jsonify({"message": "Invalid sort, use sort=top_rated"}), 400
+
+    def nearby(places):
+        for place in places:
+            if place.location_latitude is None or place.location_longitude is None:
+                continue
+            if haversine_km(lat, lon, place.location_latitude, place.location_longitude) <= radius_km:
+                yield place
+
+    media = media_links()
+    return stream_json_array(
+        itertools.islice(nearby(stream_query(all_places)), limit if limit and limit > 0 else None),
+        serialize=lambda place: place.to_dict(media),
+    )
 
 @bp.route("/places/<place_id>", methods=["GET"])
 def get_place_details(place_id):
@@ -189,7 +202,7 @@ def get_place_details(place_id):
     place = Place.query.get(place_uuid)
     if not place:
         return jsonify({"message": "Place not found"}), 404
-    return jsonify(place.to_dict()), 200
+    return jsonify(place.to_dict(media_links())), 200
 
 @bp.route("/places/<place_id>", methods=["PUT"])
 @jwt_required() # Or admin only
@@ -220,7 +233,7 @@ def update_place(place_id):
     place.location_latitude=data.get("location_latitude", place.location_latitude)
     place.location_longitude=data.get("location_longitude", place.location_longitude)
     place.description=data.get("description", place.description)
-    place.rating=data.get("rating", place.rating)
+    # Ratings come from reviews only (POST /api/places/<id>/reviews)
     place.phone_number=data.get("phone_number", place.phone_number)
     place.website_url=data.get("website_url", place.website_url)
     place.hours_of_operation=data.get("hours_of_operation", place.hours_of_operation)
@@ -228,7 +241,7 @@ def update_place(place_id):
     place.is_verified=data.get("is_verified", place.is_verified) # Admin might change this
 
     db.session.commit()
-    return jsonify(place.to_dict()), 200
+    return jsonify(place.to_dict(media_links())), 200
 
 @bp.route("/places/<place_id>", methods=["DELETE"])
 @jwt_required() # Or admin only
@@ -248,6 +261,7 @@ def delete_place(place_id):
     # if str(place.added_by_user_id) != current_user_id and not User.query.get(current_user_id).is_admin:
     #     return jsonify({"message": "Unauthorized"}), 403
 
+    record_deletion("place", place.id) # Places are shared, so the tombstone is for everyone
     db.session.delete(place)
     db.session.commit()
     return jsonify({"message": "Place deleted successfully"}), 200
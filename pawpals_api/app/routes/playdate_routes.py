@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models.models import Playdate, Dog, User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.models import Playdate, PlaydateArchive, Dog, User
+from app.models.enums import PLAYDATE_STATUSES, normalize
+from app.utils.auth import jwt_required
+from flask_jwt_extended import get_jwt_identity
+from app.utils.streaming import stream_json_array, stream_query
+from app.services.partition_service import archive_exists
+from app.services.sync_service import record_deletion
 import uuid
 from datetime import datetime
 
@@ -69,17 +74,15 @@ def get_user_playdates():
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    # Get all dogs belonging to the user
-    user_dog_ids = [dog.id for dog in user.dogs]
-    if not user_dog_ids:
-        return jsonify([]), 200 # No dogs, so no playdates
+    # Dogs belonging to the user, as a subquery so their rows are never loaded
+    user_dog_ids = db.session.query(Dog.id).filter(Dog.user_id == user.id)
 
     # Find playdates where any of the user's dogs are dog1_id or dog2_id
     playdates = Playdate.query.filter(
         (Playdate.dog1_id.in_(user_dog_ids)) | (Playdate.dog2_id.in_(user_dog_ids))
-    ).order_by(Playdate.playdate_time.desc()).all()
-    
-    return jsonify([playdate.to_dict() for playdate in playdates]), 200
+    ).order_by(Playdate.playdate_time.desc())
+
+    return stream_json_array(stream_query(playdates))
 
 @bp.route("/playdates/dog/<dog_id>", methods=["GET"])
 @jwt_required()
@@ -104,10 +107,54 @@ def get_dog_playdates(dog_id):
     if status_filter == "upcoming":
         query = query.filter(Playdate.playdate_time >= datetime.utcnow(), Playdate.status.in_(["pending", "accepted"]))
     elif status_filter:
-        query = query.filter(Playdate.status == status_filter)
+        query = query.filter(Playdate.status == normalize("status", status_filter, PLAYDATE_STATUSES))
         
-    playdates = query.order_by(Playdate.playdate_time.desc()).all()
-    return jsonify([playdate.to_dict() for playdate in playdates]), 200
+    playdates = query.order_by(Playdate.playdate_time.desc())
+    return stream_json_array(stream_query(playdates))
+
+@bp.route("/playdates/history", methods=["GET"])
+@jwt_required()
+def get_playdate_history():
+    # Archived playdates (moved out of the playdates table by `flask archive-playdates`), newest first
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+
+    dog_id = request.args.get("dog_id")
+    if dog_id:
+        try:
+            dog_uuid = uuid.UUID(dog_id)
+        except ValueError:
+            return jsonify({"message": "Invalid dog ID format"}), 400
+        dog = Dog.query.get(dog_uuid)
+        if not dog:
+            return jsonify({"message": "Dog not found"}), 404
+        if dog.user_id != user.id:
+            return jsonify({"message": "Unauthorized to view this dog's playdates"}), 403
+        query = PlaydateArchive.query.filter((PlaydateArchive.dog1_id == dog_uuid) | (PlaydateArchive.dog2_id == dog_uuid))
+    else:
+        user_dog_ids = db.session.query(Dog.id).filter(Dog.user_id == user.id)
+        query = PlaydateArchive.query.filter(
+            (PlaydateArchive.dog1_id.in_(user_dog_ids)) | (PlaydateArchive.dog2_id.in_(user_dog_ids))
+        )
+
+    # Bounding playdate_time limits the scan to the matching archived months
+    try:
+        if request.args.get("after"):
+            query = query.filter(PlaydateArchive.playdate_time >= datetime.fromisoformat(request.args["after"]))
+        if request.args.get("before"):
+            query = query.filter(PlaydateArchive.playdate_time < datetime.fromisoformat(request.args["before"]))
+    except ValueError as e:
+        return jsonify({"message": f"Invalid date format: {e}"}), 400
+    if request.args.get("status"):
+        query = query.filter(PlaydateArchive.status == normalize("status", request.args["status"], PLAYDATE_STATUSES))
+
+    if not archive_exists():
+        return jsonify([]), 200  # Playdates were never partitioned, so nothing has been archived
+
+    playdates = query.order_by(PlaydateArchive.playdate_time.desc())
+    return stream_json_array(stream_query(playdates))
 
 @bp.route("/playdates/<playdate_id>", methods=["GET"])
 @jwt_required()
@@ -118,7 +165,7 @@ def get_playdate_details(playdate_id):
     except ValueError:
         return jsonify({"message": "Invalid playdate ID format"}), 400
 
-    playdate = Playdate.query.get(playdate_uuid)
+    playdate = Playdate.query.filter_by(id=playdate_uuid).first()
     if not playdate:
         return jsonify({"message": "Playdate not found"}), 404
 
@@ -141,11 +188,11 @@ def update_playdate_status(playdate_id):
         return jsonify({"message": "Invalid playdate ID format"}), 400
 
     data = request.get_json()
-    new_status = data.get("status")
+    new_status = normalize("status", data.get("status"), PLAYDATE_STATUSES)
     if not new_status or new_status not in ["accepted", "declined", "cancelled", "completed"]:
         return jsonify({"message": "Invalid or missing status"}), 400
 
-    playdate = Playdate.query.get(playdate_uuid)
+    playdate = Playdate.query.filter_by(id=playdate_uuid).first()
     if not playdate:
         return jsonify({"message": "Playdate not found"}), 404
 
@@ -192,7 +239,7 @@ def delete_playdate(playdate_id): # Typically, playdates might be cancelled rath
     except ValueError:
         return jsonify({"message": "Invalid playdate ID format"}), 400
 
-    playdate = Playdate.query.get(playdate_uuid)
+    playdate = Playdate.query.filter_by(id=playdate_uuid).first()
     if not playdate:
         return jsonify({"message": "Playdate not found"}), 404
 
@@ -202,6 +249,7 @@ def delete_playdate(playdate_id): # Typically, playdates might be cancelled rath
         # More complex auth might be needed, or this endpoint might be admin-only
         return jsonify({"message": "Unauthorized or playdate not in a deletable state"}), 403
 
+    record_deletion("playdate", playdate.id, [playdate.dog1.user_id, playdate.dog2.user_id])
     db.session.delete(playdate)
     db.session.commit()
     return jsonify({"message": "Playdate deleted successfully"}), 200
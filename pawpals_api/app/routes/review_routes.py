@@ -0,0 +1,117 @@
+from flask import Blueprint, request, jsonify
+from app import db
+from app.models.models import Place, Review, User
+from app.services.review_service import apply_rating_change
+from app.utils.auth import jwt_required
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+import uuid
+
+bp = Blueprint("reviews", __name__)
+
+def _parse_rating(data):
+    rating = data.get("rating")
+    # bool is an int subclass; reject it along with floats and strings
+    if isinstance(rating, bool) or not isinstance(rating, int) or not 1 <= rating <= 5:
+        return None
+    return rating
+
+def _get_place(place_id):
+    try:
+        place_uuid = uuid.UUID(place_id)
+    except ValueError:
+        return None, (jsonify({"message": "Invalid place ID format"}), 400)
+    # Only existence is needed; don't load the row
+    if not db.session.query(Place.query.filter_by(id=place_uuid).exists()).scalar():
+        return None, (jsonify({"message": "Place not found"}), 404)
+    return place_uuid, None
+
+@bp.route("/places/<place_id>/reviews", methods=["GET"])
+def get_place_reviews(place_id):
+    place_uuid, error = _get_place(place_id)
+    if error:
+        return error
+
+    page = request.args.get("page", 1, type=int)
+    per_page = min(request.args.get("per_page", 20, type=int), 100)
+    reviews_page = (
+        Review.query.filter_by(place_id=place_uuid)
+        .order_by(Review.created_at.desc(), Review.id)
+        .paginate(page=page, per_page=per_page, error_out=False)
+    )
+    return jsonify({
+        "reviews": [review.to_dict() for review in reviews_page.items],
+        "total_pages": reviews_page.pages,
+        "current_page": reviews_page.page,
+        "total_items": reviews_page.total
+    }), 200
+
+@bp.route("/places/<place_id>/reviews", methods=["POST"])
+@jwt_required()
+def create_review(place_id):
+    current_user_id = get_jwt_identity()
+    if not User.query.get(current_user_id):
+        return jsonify({"message": "User not found"}), 404
+    place_uuid, error = _get_place(place_id)
+    if error:
+        return error
+
+    data = request.get_json() or {}
+    rating = _parse_rating(data)
+    if rating is None:
+        return jsonify({"message": "Rating must be a whole number from 1 to 5"}), 400
+
+    review = Review(place_id=place_uuid, user_id=current_user_id, rating=rating, comment=data.get("comment"))
+    db.session.add(review)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # The unique (user_id, place_id) constraint also settles two concurrent first reviews
+        db.session.rollback()
+        return jsonify({"message": "You have already reviewed this place"}), 409
+    apply_rating_change(place_uuid, rating, 1)
+    db.session.commit()
+    return jsonify(review.to_dict()), 201
+
+@bp.route("/places/<place_id>/reviews/me", methods=["PUT"])
+@jwt_required()
+def update_my_review(place_id):
+    current_user_id = get_jwt_identity()
+    place_uuid, error = _get_place(place_id)
+    if error:
+        return error
+
+    # Lock the review so a concurrent edit can't apply its delta against a stale rating
+    review = Review.query.filter_by(place_id=place_uuid, user_id=current_user_id).with_for_update(of=Review).first()
+    if not review:
+        return jsonify({"message": "Review not found"}), 404
+
+    data = request.get_json() or {}
+    if "rating" in data:
+        rating = _parse_rating(data)
+        if rating is None:
+            return jsonify({"message": "Rating must be a whole number from 1 to 5"}), 400
+        if rating != review.rating:
+            apply_rating_change(place_uuid, rating - review.rating, 0)
+            review.rating = rating
+    review.comment = data.get("comment", review.comment)
+
+    db.session.commit()
+    return jsonify(review.to_dict()), 200
+
+@bp.route("/places/<place_id>/reviews/me", methods=["DELETE"])
+@jwt_required()
+def delete_my_review(place_id):
+    current_user_id = get_jwt_identity()
+    place_uuid, error = _get_place(place_id)
+    if error:
+        return error
+
+    review = Review.query.filter_by(place_id=place_uuid, user_id=current_user_id).with_for_update(of=Review).first()
+    if not review:
+        return jsonify({"message": "Review not found"}), 404
+
+    apply_rating_change(place_uuid, -review.rating, -1)
+    db.session.delete(review)
+    db.session.commit()
+    return jsonify({"message": "Review deleted successfully"}), 200
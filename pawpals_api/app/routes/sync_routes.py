@@ -0,0 +1,24 @@
+from flask import Blueprint, request, jsonify
+from app.models.models import User
+from app.services.sync_service import InvalidSyncToken, build_changeset
+from app.utils.auth import jwt_required
+from app.utils.db_routing import read_from_primary
+from flask_jwt_extended import get_jwt_identity
+
+bp = Blueprint("sync", __name__)
+
+@bp.route("/sync", methods=["GET"])
+@jwt_required()
+def sync():
+    # First call without ?since= returns everything; afterwards pass back the returned token.
+    # Keep calling while has_more is true. reset=true means drop local data and start over.
+    read_from_primary()  # The cursor's upper bound comes from the primary's open transactions
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+
+    try:
+        changeset = build_changeset(user, request.args.get("since"))
+    except InvalidSyncToken as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(changeset), 200
@@ -0,0 +1,187 @@
+"""
+Monthly partitions of the playdates table, and archiving of finished months.
+
+On PostgreSQL, partition_playdates.sql turns playdates into a table range-partitioned
+by month on playdate_time (playdates_YYYY_MM, plus playdates_default for anything
+outside them), and creates playdates_archive, partitioned the same way. A query that
+filters on playdate_time, like ?status=upcoming, only scans the months it can match.
+
+create_partitions() adds the months ahead, so new playdates don't pile up in the
+default partition. archive_partitions() moves months older than
+PLAYDATE_ARCHIVE_AFTER_MONTHS into playdates_archive. It detaches each partition and
+attaches it to the archive, so no rows are copied, and the playdates table only ever
+holds recent and upcoming months. Only months whose playdates are all in a final
+status (declined, cancelled, completed) are archived: delta sync doesn't cover the
+archive, so a playdate moved there must never change again. Months still holding a
+pending or accepted playdate stay live and are reported, and later runs archive them
+once those playdates have been settled.
+
+Other databases (the SQLite benchmark stand-in) keep one plain table, and both
+functions do nothing there.
+"""
+
+import re
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from app import db
+
+PARENT = "playdates"
+ARCHIVE = "playdates_archive"
+DEFAULT_PARTITION = "playdates_default"
+# Fail rather than queue behind long queries: DETACH and CREATE ... PARTITION OF lock the playdates table
+LOCK_TIMEOUT = "5s"
+_MONTHLY_PARTITION = re.compile(r"^playdates_(\d{4})_(\d{2})$")
+OPEN_STATUSES = ("pending", "accepted")
+
+_archive_exists = None  # Per process; see archive_exists()
+
+
+def include_in_migrations(obj, name, type_, reflected, compare_to):
+    """Alembic include_object hook: the partitions and the archive are managed here, not by migrations."""
+    if type_ == "table" and (name in (ARCHIVE, DEFAULT_PARTITION) or _MONTHLY_PARTITION.match(name)):
+        return False
+    return True
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARENT}_{month:%Y_%m}"
+
+
+def _month_bounds(month):
+    return {"start": month, "end": add_months(month, 1)}
+
+
+def _for_values(month):
+    # Partition bounds must be literals, not bind parameters
+    return f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def is_partitioned(conn):
+    if conn.dialect.name != "postgresql":
+        return False
+    row = conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"), {"name": PARENT}
+    ).first()
+    return row is not None
+
+
+def archive_exists():
+    """
+    Whether playdates_archive exists. partition_playdates.sql creates it on PostgreSQL, and a
+    database that was never partitioned has none, so readers of the archive check first.
+
+    The answer is cached for the life of the process either way, so a database without the
+    archive isn't asked again on every request. Restart the workers (or send gunicorn HUP)
+    after running partition_playdates.sql so they see it.
+    """
+    global _archive_exists
+    if _archive_exists is None:
+        _archive_exists = inspect(db.session.connection()).has_table(ARCHIVE)
+    return _archive_exists
+
+
+def _monthly_partitions(conn, parent):
+    """Month -> name of the monthly partitions attached to parent."""
+    names = conn.execute(
+        text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:parent)"),
+        {"parent": parent},
+    ).scalars()
+    return {date(int(m.group(1)), int(m.group(2)), 1): m.group(0) for m in map(_MONTHLY_PARTITION.match, names) if m}
+
+
+def _detached_partitions(conn):
+    """Months detached from playdates whose attach to the archive didn't happen (e.g. the command was interrupted)."""
+    names = conn.execute(
+        text("SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition AND relname ~ '^playdates_[0-9]{4}_[0-9]{2}$'")
+    ).scalars()
+    return {date(int(m.group(1)), int(m.group(2)), 1) for m in map(_MONTHLY_PARTITION.match, names) if m}
+
+
+def _create_partition(conn, month):
+    name, bounds = partition_name(month), _month_bounds(month)
+    in_month = "playdate_time >= :start AND playdate_time < :end"
+    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    # CREATE ... PARTITION OF fails if the default partition holds rows for the new month, so move them over
+    misplaced = conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is not None and (
+        conn.execute(text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month} LIMIT 1"), bounds).first() is not None
+    )
+    if misplaced:
+        conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT} {_for_values(month)}"))
+    if misplaced:
+        conn.execute(text(f"INSERT INTO {PARENT} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+        conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def create_partitions(months_ahead=None):
+    """Create any missing monthly partitions from this month to months_ahead. Returns their names, None if not partitioned."""
+    if months_ahead is None:
+        months_ahead = current_app.config["PLAYDATE_PARTITION_MONTHS_AHEAD"]
+    created = []
+    with db.engine.connect() as conn:
+        if not is_partitioned(conn):
+            return None
+        existing = _monthly_partitions(conn, PARENT)
+        conn.commit()
+        this_month = month_start(datetime.utcnow())
+        for month in (add_months(this_month, offset) for offset in range(months_ahead + 1)):
+            if month not in existing:
+                _create_partition(conn, month)
+                conn.commit()
+                created.append(partition_name(month))
+    return created
+
+
+def _detach_if_finished(conn, name):
+    """Detach a month from playdates if none of its playdates can still change. Returns whether it was detached."""
+    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    # SHARE blocks writes to the month until the detach, so no playdate can reopen after the check
+    conn.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+    open_statuses = ", ".join(f"'{status}'" for status in OPEN_STATUSES)
+    if conn.execute(text(f"SELECT 1 FROM {name} WHERE status IN ({open_statuses}) LIMIT 1")).first() is not None:
+        conn.rollback()
+        return False
+    conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+    conn.commit()  # Releases the lock on playdates before the attach scans the month's rows
+    return True
+
+
+def archive_partitions(older_than_months=None):
+    """
+    Move the monthly partitions older than older_than_months into playdates_archive.
+
+    Returns (archived, unfinished) partition names, where unfinished months still hold
+    pending or accepted playdates and were left in place; None if not partitioned.
+    """
+    if older_than_months is None:
+        older_than_months = current_app.config["PLAYDATE_ARCHIVE_AFTER_MONTHS"]
+    cutoff = add_months(month_start(datetime.utcnow()), -older_than_months)
+    archived, unfinished = [], []
+    with db.engine.connect() as conn:
+        if not is_partitioned(conn):
+            return None
+        months = {month for month in _monthly_partitions(conn, PARENT) if month < cutoff}
+        leftovers = _detached_partitions(conn)
+        conn.commit()
+        for month in sorted(months | leftovers):
+            name = partition_name(month)
+            if month in months and not _detach_if_finished(conn, name):
+                unfinished.append(name)
+                continue
+            conn.execute(text(f"ALTER TABLE {ARCHIVE} ATTACH PARTITION {name} {_for_values(month)}"))
+            conn.commit()
+            archived.append(name)
+    return archived, unfinished
@@ -0,0 +1,201 @@
+"""
+Hard-deletes soft-deleted users and dogs in bounded batches.
+
+DELETE /api/dogs/<id> and DELETE /api/auth/me only stamp deleted_at, which hides
+the rows (see the do_orm_execute hook in app/models/models.py). The request stays
+O(1) however much history the account has. This module removes the rows
+afterwards, PURGE_BATCH_SIZE rows per transaction so no single statement holds
+locks on a large history: first the deleted dogs' playdates (tombstoning them
+for the other owner's sync) and archived playdates, then the dogs, then the
+deleted users' reviews (taking them out of the places' ratings), then users
+with nothing left.
+
+It runs in a background thread that deletions wake up, and checks again every
+PURGE_INTERVAL_SECONDS. `flask purge-deleted` does the same from the command line.
+Every worker process has its own thread, so a run first takes a PostgreSQL advisory
+lock, and skips its turn while another process's run holds it.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import delete, exists, or_, select, text
+
+from app import db
+from app.models.models import Dog, Playdate, PlaydateArchive, Review, User
+from app.services.partition_service import archive_exists
+from app.services.review_service import apply_rating_change
+from app.services.sync_service import record_playdate_deletions
+
+users = User.__table__
+dogs = Dog.__table__
+playdates = Playdate.__table__
+archived_playdates = PlaydateArchive.__table__
+reviews = Review.__table__
+
+# Advisory lock key held for the duration of a purge run (any constant unique to this job)
+PURGE_LOCK_KEY = 7_061_232
+_run_lock = threading.Lock()  # The same within one process, and all there is on other databases
+
+_wakeup = threading.Event()
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def _purge_playdates(batch_size):
+    deleted_dogs = select(dogs.c.id).where(dogs.c.deleted_at.isnot(None))
+    ids = db.session.execute(
+        select(playdates.c.id)
+        .where(or_(playdates.c.dog1_id.in_(deleted_dogs), playdates.c.dog2_id.in_(deleted_dogs)))
+        .limit(batch_size)
+    ).scalars().all()
+    if ids:
+        record_playdate_deletions(Playdate.id.in_(ids))
+        db.session.execute(delete(playdates).where(playdates.c.id.in_(ids)))
+    return len(ids)
+
+
+def _purge_archived_playdates(batch_size):
+    # Not in delta sync, so no tombstones
+    if not archive_exists():
+        return 0
+    deleted_dogs = select(dogs.c.id).where(dogs.c.deleted_at.isnot(None))
+    ids = db.session.execute(
+        select(archived_playdates.c.id)
+        .where(or_(archived_playdates.c.dog1_id.in_(deleted_dogs), archived_playdates.c.dog2_id.in_(deleted_dogs)))
+        .limit(batch_size)
+    ).scalars().all()
+    if ids:
+        db.session.execute(delete(archived_playdates).where(archived_playdates.c.id.in_(ids)))
+    return len(ids)
+
+
+def _purge_dogs(batch_size):
+    ids = db.session.execute(select(dogs.c.id).where(dogs.c.deleted_at.isnot(None)).limit(batch_size)).scalars().all()
+    if ids:
+        # Anything created against these dogs since the playdate pass goes with ON DELETE CASCADE
+        db.session.execute(delete(dogs).where(dogs.c.id.in_(ids)))
+    return len(ids)
+
+
+def _purge_reviews(batch_size):
+    deleted_users = select(users.c.id).where(users.c.deleted_at.isnot(None))
+    batch = select(reviews.c.id).where(reviews.c.user_id.in_(deleted_users)).limit(batch_size)
+    # ON DELETE CASCADE would drop these too, but without updating the places' rating aggregates.
+    # The deltas come from the rows this DELETE actually removed, so a concurrent purge can't subtract them twice.
+    rows = db.session.execute(
+        delete(reviews).where(reviews.c.id.in_(batch)).returning(reviews.c.place_id, reviews.c.rating)
+    ).all()
+    changes = {}
+    for place_id, rating in rows:
+        rating_sum, rating_count = changes.get(place_id, (0, 0))
+        changes[place_id] = (rating_sum + rating, rating_count + 1)
+    for place_id, (rating_sum, rating_count) in changes.items():
+        apply_rating_change(place_id, -rating_sum, -rating_count)
+    return len(rows)
+
+
+def _purge_users(batch_size):
+    ids = db.session.execute(
+        select(users.c.id)
+        .where(
+            users.c.deleted_at.isnot(None),
+            ~exists().where(dogs.c.user_id == users.c.id),
+            ~exists().where(reviews.c.user_id == users.c.id),
+        )
+        .limit(batch_size)
+    ).scalars().all()
+    if ids:
+        db.session.execute(delete(users).where(users.c.id.in_(ids)))
+    return len(ids)
+
+
+@contextmanager
+def _exclusive_run():
+    """Yield True if no other purge run, in any process, is in progress; it then can't start until this one ends."""
+    if not _run_lock.acquire(blocking=False):
+        yield False
+        return
+    try:
+        if db.engine.dialect.name != "postgresql":
+            yield True
+            return
+        # A session-level lock on a connection of its own outlives the batches' commits,
+        # and is released by the server if this process dies mid-run
+        with db.engine.connect() as conn:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": PURGE_LOCK_KEY}).scalar()
+            conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PURGE_LOCK_KEY})
+                    conn.commit()
+    finally:
+        _run_lock.release()
+
+
+def purge_deleted(batch_size=None, max_batches=None):
+    """
+    Remove soft-deleted rows, one committed batch at a time. Returns rows removed per table,
+    or None if another purge run was already in progress.
+    """
+    with _exclusive_run() as acquired:
+        if not acquired:
+            return None
+        return _purge_batches(batch_size or current_app.config["PURGE_BATCH_SIZE"], max_batches)
+
+
+def _purge_batches(batch_size, max_batches):
+    removed = {"playdates": 0, "dogs": 0, "reviews": 0, "users": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        # Children first, so each batch's deletes never cascade into unbounded work
+        steps = (
+            ("playdates", _purge_playdates),
+            ("playdates", _purge_archived_playdates),
+            ("dogs", _purge_dogs),
+            ("reviews", _purge_reviews),
+            ("users", _purge_users),
+        )
+        for name, purge in steps:
+            count = purge(batch_size)
+            if count:
+                removed[name] += count
+                break
+        else:
+            break
+        db.session.commit()
+        batches += 1
+    return removed
+
+
+def _run_worker(app):
+    while True:
+        _wakeup.wait(app.config["PURGE_INTERVAL_SECONDS"])
+        _wakeup.clear()
+        with app.app_context():
+            try:
+                removed = purge_deleted()
+                if removed and any(removed.values()):
+                    app.logger.info(f"Purged soft-deleted rows: {removed}")
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Purging soft-deleted rows failed")
+
+
+def schedule_purge(app):
+    """Wake this process's purge thread, starting it on first use."""
+    global _worker, _worker_pid
+    if not app.config["PURGE_IN_BACKGROUND"]:
+        return
+    with _worker_lock:
+        # Threads don't survive a fork, so each worker process starts its own
+        if _worker is None or not _worker.is_alive() or _worker_pid != os.getpid():
+            _worker = threading.Thread(target=_run_worker, args=(app,), name="purge", daemon=True)
+            _worker.start()
+            _worker_pid = os.getpid()
+    _wakeup.set()
@@ -0,0 +1,49 @@
+"""
+Keeps Place.rating_sum, rating_count and rating_score in step with the reviews table.
+
+Every review write adjusts its place's aggregates with one relative UPDATE in the
+same transaction (rating_sum = rating_sum + delta, ...). Concurrent reviews of a
+place never overwrite each other's counts, and reading a place, or sorting
+places by rating_score, never has to aggregate reviews.
+"""
+
+from flask import current_app
+from sqlalchemy import func, select, update
+
+from app import db
+from app.models.models import Place, Review
+
+places = Place.__table__
+reviews = Review.__table__
+
+
+def bayesian_score(rating_sum, rating_count):
+    """SQL expression ranking places by rating without letting a single 5-star review top the list."""
+    weight = current_app.config["REVIEW_PRIOR_WEIGHT"]
+    mean = current_app.config["REVIEW_PRIOR_MEAN"]
+    return (float(weight * mean) + rating_sum) / (float(weight) + rating_count)
+
+
+def apply_rating_change(place_id, sum_delta, count_delta):
+    new_sum = places.c.rating_sum + sum_delta
+    new_count = places.c.rating_count + count_delta
+    db.session.execute(
+        update(places)
+        .where(places.c.id == place_id)
+        .values(rating_sum=new_sum, rating_count=new_count, rating_score=bayesian_score(new_sum, new_count))
+    )
+
+
+def recompute_place_ratings():
+    """Rebuild every place's aggregates from its reviews, e.g. after changing the REVIEW_PRIOR_* settings."""
+    rating_sum = (
+        select(func.coalesce(func.sum(reviews.c.rating), 0)).where(reviews.c.place_id == places.c.id).scalar_subquery()
+    )
+    rating_count = select(func.count()).where(reviews.c.place_id == places.c.id).scalar_subquery()
+    result = db.session.execute(
+        update(places).values(
+            rating_sum=rating_sum, rating_count=rating_count, rating_score=bayesian_score(rating_sum, rating_count)
+        )
+    )
+    db.session.commit()
+    return result.rowcount
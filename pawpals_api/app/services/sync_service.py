@@ -0,0 +1,201 @@
+"""
+Incremental sync for offline-first clients.
+
+A sync token holds one keyset cursor (updated_at, id) per entity type, plus the
+time it was issued. Each call returns the rows that changed after those cursors,
+and the tombstones of rows deleted since then. Each type is capped at
+SYNC_PAGE_SIZE rows per call, and the response sets has_more until the client
+has caught up.
+
+updated_at is stamped with now(), which on PostgreSQL is the time the writing
+transaction started, not when it commits. So each call only hands out rows up to
+an upper bound that stops short of the oldest transaction still open on the
+primary (from pg_stat_activity): a transaction that started earlier but commits
+later could otherwise land behind a cursor the client already has. This holds
+however long the transaction runs, so a slow purge batch or a lock wait can hold
+cursors back but never make a client miss a row. Sync reads from the primary for
+the same reason: a replica can't tell which of its missing rows are still to come.
+The app's role sees its own sessions in pg_stat_activity; if other roles write to
+these tables, grant it pg_read_all_stats. The bound also stays
+SYNC_SAFETY_LAG_SECONDS behind now(), which is all other databases get (on SQLite,
+writes are serialized and timestamps have one-second resolution).
+
+Token timestamps are aware UTC. The columns are naive UTC (connections to
+PostgreSQL run with timezone=UTC), so cursors are converted on the way in and out.
+"""
+
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, text
+
+from app import db
+from app.models.models import Dog, Place, Playdate, Tombstone, User
+from app.utils.media import media_links
+
+TOKEN_VERSION = 1
+TOMBSTONE_TYPES = {"dog": "dogs", "place": "places", "playdate": "playdates"}
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def encode_token(cursors, issued_at):
+    payload = {
+        "v": TOKEN_VERSION,
+        "t": issued_at.isoformat(),
+        "c": {name: [_as_utc(ts).isoformat(), str(row_id) if row_id else None] for name, (ts, row_id) in cursors.items()},
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if payload.get("v") != TOKEN_VERSION:
+            raise InvalidSyncToken("Unsupported sync token version")
+        cursors = {
+            name: (_as_utc(datetime.fromisoformat(ts)), uuid.UUID(row_id) if row_id else None)
+            for name, (ts, row_id) in payload["c"].items()
+        }
+        return cursors, _as_utc(datetime.fromisoformat(payload["t"]))
+    except InvalidSyncToken:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidSyncToken(f"Malformed sync token: {e}") from e
+
+
+def record_deletion(entity_type, entity_id, user_ids=(None,)):
+    """Add tombstones for a deleted row to the current session (committed with the delete)."""
+    for user_id in set(user_ids):
+        db.session.add(Tombstone(entity_type=entity_type, entity_id=entity_id, user_id=user_id))
+
+
+def record_playdate_deletions(playdate_filter):
+    """Tombstone every playdate matching the filter, once for each owner involved."""
+    dog1 = db.aliased(Dog)
+    dog2 = db.aliased(Dog)
+    rows = (
+        db.session.query(Playdate.id, dog1.user_id, dog2.user_id)
+        .join(dog1, Playdate.dog1_id == dog1.id)
+        .join(dog2, Playdate.dog2_id == dog2.id)
+        .filter(playdate_filter)
+        .execution_options(include_deleted=True) # Also called while purging soft-deleted dogs
+    )
+    for playdate_id, owner1, owner2 in rows:
+        record_deletion("playdate", playdate_id, (owner1, owner2))
+
+
+def _as_utc(value):
+    # now() is timezone-aware on PostgreSQL, and columns and SQLite's now() are naive UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _column_value(value):
+    # Compare against the naive UTC columns as naive UTC, not as a timestamptz the database would convert
+    return _as_utc(value).replace(tzinfo=None)
+
+
+def _oldest_open_transaction():
+    """Start of the oldest other transaction open on PostgreSQL, whose rows may still commit; None elsewhere."""
+    if db.session.get_bind().dialect.name != "postgresql":
+        return None
+    oldest = db.session.execute(text(
+        "SELECT min(xact_start) FROM pg_stat_activity WHERE datname = current_database() "
+        "AND backend_type = 'client backend' AND pid <> pg_backend_pid()"
+    )).scalar()
+    return _as_utc(oldest) if oldest is not None else None
+
+
+def _after(column_ts, column_id, cursor):
+    if cursor is None:
+        return None
+    ts, row_id = cursor
+    if row_id is None:
+        return column_ts > _column_value(ts)
+    return or_(column_ts > _column_value(ts), and_(column_ts == _column_value(ts), column_id > row_id))
+
+
+def _page(query, column_ts, column_id, cursor, upper, limit):
+    """One page of rows changed after the cursor; returns (rows, new cursor, has_more)."""
+    query = query.filter(column_ts <= _column_value(upper))
+    condition = _after(column_ts, column_id, cursor)
+    if condition is not None:
+        query = query.filter(condition)
+    rows = query.order_by(column_ts, column_id).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (_as_utc(getattr(last, column_ts.key)), getattr(last, column_id.key)), True
+    # Caught up: everything up to the upper bound has been seen
+    return rows, (upper, None), False
+
+
+def build_changeset(user, token=None):
+    config = current_app.config
+    limit = config["SYNC_PAGE_SIZE"]
+    now = _as_utc(db.session.execute(select(db.func.now())).scalar())
+    upper = now - timedelta(seconds=config["SYNC_SAFETY_LAG_SECONDS"])
+    oldest_open = _oldest_open_transaction()
+    if oldest_open is not None:
+        # Rows it writes are stamped with its start time, so stop just short of it
+        upper = min(upper, oldest_open - timedelta(microseconds=1))
+
+    cursors, reset = {}, False
+    if token:
+        cursors, issued_at = decode_token(token)
+        if issued_at < now - timedelta(days=config["SYNC_TOMBSTONE_RETENTION_DAYS"]):
+            # Tombstones this client needs may already be purged: start over
+            cursors, reset = {}, True
+    initial = not cursors
+
+    user_dog_ids = select(Dog.id).where(Dog.user_id == user.id)
+    sources = {
+        "users": User.query.filter(User.id == user.id),
+        "dogs": Dog.query.filter(Dog.user_id == user.id),
+        "places": Place.query,
+        "playdates": Playdate.query.filter(or_(Playdate.dog1_id.in_(user_dog_ids), Playdate.dog2_id.in_(user_dog_ids))),
+    }
+
+    media = media_links()
+    changes, new_cursors, has_more = {}, {}, False
+    for name, query in sources.items():
+        model = query.column_descriptions[0]["entity"]
+        rows, new_cursors[name], more = _page(query, model.updated_at, model.id, cursors.get(name), upper, limit)
+        changes[name] = [row.to_dict() if model is Playdate else row.to_dict(media) for row in rows]
+        has_more = has_more or more
+
+    deleted = {name: [] for name in TOMBSTONE_TYPES.values()}
+    if initial:
+        # A full snapshot has nothing to delete; just start tracking tombstones from here
+        new_cursors["tombstones"] = (upper, None)
+    else:
+        tombstones = Tombstone.query.filter(or_(Tombstone.user_id == user.id, Tombstone.user_id.is_(None)))
+        rows, new_cursors["tombstones"], more = _page(
+            tombstones, Tombstone.deleted_at, Tombstone.id, cursors.get("tombstones"), upper, limit
+        )
+        for row in rows:
+            deleted[TOMBSTONE_TYPES[row.entity_type]].append(row.entity_id)
+        has_more = has_more or more
+
+    return {
+        "token": encode_token(new_cursors, now),
+        "has_more": has_more,
+        "reset": reset,
+        "changes": changes,
+        "deleted": deleted,
+    }
+
+
+def purge_tombstones(retention_days):
+    cutoff = db.session.execute(select(db.func.now())).scalar() - timedelta(days=retention_days)
+    deleted = Tombstone.query.filter(Tombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
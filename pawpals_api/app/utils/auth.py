@@ -0,0 +1,74 @@
+"""
+The jwt_required decorator used by the API's views.
+
+Outside a batch it is flask_jwt_extended's jwt_required. In a POST /api/batch
+sub-request the batch has already verified the caller's token once, and puts
+the result in the sub-request's WSGI environ; the view then only checks those
+claims against its own optional, fresh and refresh requirements instead of
+decoding the Authorization header again. A batch of N calls costs one JWT
+decode, not N + 1.
+"""
+
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, request
+from flask_jwt_extended import jwt_required as _jwt_required
+from flask_jwt_extended.exceptions import FreshTokenRequired, NoAuthorizationError, WrongTokenError
+
+# Environ rather than g: sequential batch sub-requests share the batch's g. Clients can't set it,
+# since request headers only ever reach the environ as HTTP_* keys.
+VERIFIED_JWT_KEY = "pawpals.verified_jwt"
+
+
+def verified_jwt():
+    """The token the current request's jwt_required verified, to hand on to sub-requests."""
+    return {
+        "header": g._jwt_extended_jwt_header,
+        "data": g._jwt_extended_jwt,
+        "user": g._jwt_extended_jwt_user,
+        "location": g._jwt_extended_jwt_location,
+    }
+
+
+def _is_fresh(jwt_data):
+    fresh = jwt_data.get("fresh")
+    if isinstance(fresh, bool):
+        return fresh
+    return fresh is not None and fresh >= datetime.now(timezone.utc).timestamp()
+
+
+def _use_verified(verified, optional, fresh, refresh):
+    """Apply a view's requirements to an already verified token, as verify_jwt_in_request would, and store it in g."""
+    jwt_data = verified["data"]
+    if not jwt_data:
+        if not optional:
+            raise NoAuthorizationError(f"Missing {current_app.config['JWT_HEADER_NAME']} Header")
+        g._jwt_extended_jwt, g._jwt_extended_jwt_header = {}, {}
+        g._jwt_extended_jwt_user, g._jwt_extended_jwt_location = {"loaded_user": None}, None
+        return
+    if refresh and jwt_data.get("type") != "refresh":
+        raise WrongTokenError("Only refresh tokens are allowed")
+    if not refresh and jwt_data.get("type") == "refresh":
+        raise WrongTokenError("Only non-refresh tokens are allowed")
+    if fresh and not _is_fresh(jwt_data):
+        raise FreshTokenRequired("Fresh token required", verified["header"], jwt_data)
+    g._jwt_extended_jwt, g._jwt_extended_jwt_header = jwt_data, verified["header"]
+    g._jwt_extended_jwt_user, g._jwt_extended_jwt_location = verified["user"], verified["location"]
+
+
+def jwt_required(optional=False, fresh=False, refresh=False):
+    def wrapper(fn):
+        verify_and_call = _jwt_required(optional=optional, fresh=fresh, refresh=refresh)(fn)
+
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verified = request.environ.get(VERIFIED_JWT_KEY)
+            if verified is None:
+                return verify_and_call(*args, **kwargs)
+            _use_verified(verified, optional, fresh, refresh)
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+
+        return decorator
+
+    return wrapper
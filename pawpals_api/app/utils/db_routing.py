@@ -0,0 +1,178 @@
+"""
+Engine configuration, read-replica routing and connection-pool metrics.
+
+GET/HEAD requests read from a replica bind when replicas are configured. Any
+write in the request (a flush or an INSERT/UPDATE/DELETE statement) pins the
+rest of the request to the primary. So that clients then see their own writes
+despite replication lag, the response to a write carries a signed, timestamped
+marker, both as the STICKY_COOKIE cookie and in the STICKY_HEADER header (for
+clients without a cookie jar to send back). Requests presenting a marker younger
+than DB_REPLICA_STICKY_SECONDS read from the primary. The client carries the
+marker, so this holds whichever worker process or host serves the next request.
+"""
+
+import random
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadSignature, TimestampSigner
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.utils.metrics import REGISTRY
+
+REPLICA_BIND_PREFIX = "replica_"
+READ_ONLY_METHODS = ("GET", "HEAD")
+STICKY_COOKIE = "pawpals_last_write"
+STICKY_HEADER = "X-PawPals-Last-Write"
+
+pool_checkout_wait = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+pool_checkout_timeouts = REGISTRY.counter(
+    "db_pool_checkout_timeouts", "Checkouts that gave up after DB_POOL_TIMEOUT", ["pool"]
+)
+pool_checked_out = REGISTRY.gauge("db_pool_checked_out", "Connections currently checked out", ["pool"])
+pool_overflow = REGISTRY.gauge("db_pool_overflow", "Overflow connections currently open", ["pool"])
+pool_saturation = REGISTRY.gauge(
+    "db_pool_saturation", "Checked-out connections as a fraction of pool_size + max_overflow", ["pool"]
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def connect(self):
+        name = getattr(self, "logging_name", None) or "default"
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except sa_exc.TimeoutError:
+            pool_checkout_timeouts.inc(pool=name)
+            raise
+        pool_checkout_wait.observe(time.perf_counter() - start, pool=name)
+        return connection
+
+
+def _is_postgres(uri):
+    return make_url(uri).get_backend_name() == "postgresql"
+
+
+def _engine_options(app, uri, name):
+    if not _is_postgres(uri):
+        # SQLite and friends keep Flask-SQLAlchemy's driver defaults
+        return {}
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_logging_name": name,
+        "pool_size": app.config["DB_POOL_SIZE"],
+        "max_overflow": app.config["DB_MAX_OVERFLOW"],
+        "pool_timeout": app.config["DB_POOL_TIMEOUT"],
+        "pool_recycle": app.config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": app.config["DB_POOL_PRE_PING"],
+    }
+    # Server-stamped times (now()) land in naive timestamp columns, which the app reads as UTC
+    session_settings = "-c timezone=UTC"
+    if app.config["DB_STATEMENT_TIMEOUT_MS"]:
+        session_settings += f" -c statement_timeout={app.config['DB_STATEMENT_TIMEOUT_MS']}"
+    options["connect_args"] = {"options": session_settings}
+    return options
+
+
+def configure_engines(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS and replica SQLALCHEMY_BINDS from config. Call before db.init_app."""
+    engine_options = _engine_options(app, app.config["SQLALCHEMY_DATABASE_URI"], "primary")
+    engine_options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
+
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    for index, url in enumerate(app.config.get("DATABASE_REPLICA_URLS") or []):
+        key = f"{REPLICA_BIND_PREFIX}{index}"
+        binds.setdefault(key, {"url": url, **_engine_options(app, url, key)})
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def _sticky_signer():
+    return TimestampSigner(current_app.config["SECRET_KEY"], salt="db-replica-sticky")
+
+
+def sticky_marker():
+    """The last-write marker the client sent with this request, if any."""
+    return request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE)
+
+
+def _wrote_recently():
+    marker = sticky_marker()
+    if not marker:
+        return False
+    try:
+        _sticky_signer().unsign(marker, max_age=current_app.config["DB_REPLICA_STICKY_SECONDS"])
+    except BadSignature:  # Also raised once the marker is older than max_age
+        return False
+    return True
+
+
+def read_from_primary():
+    """Send the rest of this request's reads to the primary, for reads that must not lag behind it."""
+    g.db_replica_key = None
+
+
+def _replica_engine(engines):
+    if "db_replica_key" not in g:
+        keys = [key for key in engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+        # Stay on one replica for the whole request so reads are mutually consistent
+        g.db_replica_key = random.choice(keys) if keys else None
+        if g.db_replica_key is not None and _wrote_recently():
+            g.db_replica_key = None
+    if g.db_replica_key is None:
+        return None
+    return engines[g.db_replica_key]
+
+
+class RoutingSession(Session):
+    """Session that sends reads in GET/HEAD requests to a replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_wrote = True
+            elif request.method in READ_ONLY_METHODS and not g.get("db_wrote"):
+                engine = _replica_engine(self._db.engines)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _collect_pool_stats():
+    from app import db
+
+    for key, engine in db.engines.items():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        name = getattr(pool, "logging_name", None) or key or "default"
+        checked_out = pool.checkedout()
+        # Each bind's own overflow: replicas can be configured differently from the primary
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        pool_checked_out.set(checked_out, pool=name)
+        pool_overflow.set(max(pool.overflow(), 0), pool=name)
+        pool_saturation.set(checked_out / capacity if capacity else 0, pool=name)
+
+
+def init_db_routing(app):
+    @app.after_request
+    def mark_write(response):
+        if g.get("db_wrote") and app.config["DATABASE_REPLICA_URLS"]:
+            marker = _sticky_signer().sign("primary").decode("ascii")
+            window = app.config["DB_REPLICA_STICKY_SECONDS"]
+            response.set_cookie(STICKY_COOKIE, marker, max_age=window, httponly=True, samesite="Lax")
+            response.headers[STICKY_HEADER] = marker
+        return response
+
+    REGISTRY.add_collector(_collect_pool_stats)
@@ -0,0 +1,233 @@
+"""
+Idempotency-Key support for POST requests.
+
+A client that may retry a POST (flaky mobile networks) sends a unique
+Idempotency-Key header with it. The first request with a given key claims the
+key in the idempotency_keys table and runs normally, and its response is stored
+for IDEMPOTENCY_TTL_SECONDS. Retries with the same key replay that response,
+marked with an Idempotent-Replayed header, instead of running the view again.
+A retry that arrives while the first request is still running waits for it, for
+up to IDEMPOTENCY_WAIT_SECONDS. It polls on a short-lived connection and sleeps with
+none checked out, so waiting retries can't starve the pool the first request needs to
+finish. At most IDEMPOTENCY_MAX_WAITERS retries per key wait in each worker process;
+any more get a 409 straight away.
+
+Keys are scoped to the caller (the JWT identity, or a hash of the credentials
+sent), and reusing a key for a different request is rejected with 422. 5xx,
+401 and 429 responses are not stored, so the client can retry those for real.
+A claim left behind by a crashed worker can be taken over after
+IDEMPOTENCY_LOCK_SECONDS.
+
+The claim and the stored response are written on their own connection and
+committed straight away, independent of the request's session, so concurrent
+retries see them.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import decode_token
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.models import IdempotencyKey
+from app.utils.metrics import REGISTRY
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL_SECONDS = 0.1
+# Not stored: the client should be able to retry these for real
+UNSTORED_STATUSES = (401, 429)
+# The claim lives in the WSGI environ rather than g: batch sub-requests share the batch's g
+ENVIRON_KEY = "pawpals.idempotency"
+
+_waiters = {}  # (scope, key) -> requests in this process waiting on its in-flight original
+_waiters_lock = threading.Lock()
+
+idempotent_requests = REGISTRY.counter(
+    "idempotent_requests", "POSTs carrying an Idempotency-Key, by outcome", ["outcome"]
+)
+
+table = IdempotencyKey.__table__
+
+
+def _scope():
+    auth = request.headers.get("Authorization", "")
+    if not auth:
+        return "anonymous"
+    token = auth[7:] if auth.startswith("Bearer ") else auth
+    try:
+        return f"user:{decode_token(token)['sub']}"
+    except Exception:
+        # Expired or invalid: the view will reject it, but keep such requests apart per credential
+        return "auth:" + hashlib.sha256(auth.encode("utf-8")).hexdigest()[:59]
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b"\0" + request.full_path.encode("utf-8") + b"\0")
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _lookup(scope, key):
+    with db.engine.connect() as conn:
+        return conn.execute(select(table).where(table.c.scope == scope, table.c.key == key)).first()
+
+
+def _claim(scope, key, request_hash, row, now):
+    """Try to become the request that does the work. Returns True if the key is now ours."""
+    config = current_app.config
+    claim = dict(
+        request_hash=request_hash, status="in_progress", locked_at=now,
+        expires_at=now + timedelta(seconds=config["IDEMPOTENCY_TTL_SECONDS"]),
+    )
+    if row is None:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(table).values(scope=scope, key=key, **claim))
+            return True
+        except IntegrityError:
+            return False  # Another request claimed it first
+
+    # Take over a key that expired, or whose owner died mid-request; the WHERE makes it race-safe
+    stale_lock = now - timedelta(seconds=config["IDEMPOTENCY_LOCK_SECONDS"])
+    with db.engine.begin() as conn:
+        result = conn.execute(
+            update(table)
+            .where(table.c.id == row.id, table.c.locked_at == row.locked_at)
+            .where((table.c.expires_at <= now) | ((table.c.status == "in_progress") & (table.c.locked_at <= stale_lock)))
+            .values(response_status=None, response_mimetype=None, response_body=None, **claim)
+        )
+    return result.rowcount == 1
+
+
+def _start_waiting(slot):
+    """Count this request among the waiters for slot. Returns False if it already has as many as allowed."""
+    with _waiters_lock:
+        if _waiters.get(slot, 0) >= current_app.config["IDEMPOTENCY_MAX_WAITERS"]:
+            return False
+        _waiters[slot] = _waiters.get(slot, 0) + 1
+        return True
+
+
+def _stop_waiting(slot):
+    with _waiters_lock:
+        _waiters[slot] -= 1
+        if not _waiters[slot]:
+            del _waiters[slot]
+
+
+def _in_progress():
+    idempotent_requests.inc(outcome="conflict")
+    response = jsonify({"message": "A request with this Idempotency-Key is still in progress"})
+    response.headers["Retry-After"] = "1"
+    return response, 409
+
+
+def _replay(row):
+    response = current_app.response_class(row.response_body, status=row.response_status, mimetype=row.response_mimetype)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotency_exempt(view):
+    """Mark a view that needs no Idempotency-Key handling, e.g. because it streams a large body."""
+    view.idempotency_exempt = True
+    return view
+
+
+def _handle_idempotency_key():
+    key = request.headers.get(HEADER)
+    if not key or request.method != "POST" or request.endpoint is None:
+        return None
+    if getattr(current_app.view_functions[request.endpoint], "idempotency_exempt", False):
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        return jsonify({"message": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+    scope, request_hash = _scope(), _fingerprint()
+    deadline = time.monotonic() + current_app.config["IDEMPOTENCY_WAIT_SECONDS"]
+    waiting = False
+    try:
+        while True:
+            row = _lookup(scope, key)
+            now = datetime.utcnow()
+            if row is None or row.expires_at <= now or (
+                row.status == "in_progress"
+                and row.locked_at <= now - timedelta(seconds=current_app.config["IDEMPOTENCY_LOCK_SECONDS"])
+            ):
+                if _claim(scope, key, request_hash, row, now):
+                    request.environ[ENVIRON_KEY] = (scope, key, now)
+                    idempotent_requests.inc(outcome="executed")
+                    return None
+                continue  # Lost the race for it; look again
+
+            if row.request_hash != request_hash:
+                idempotent_requests.inc(outcome="mismatch")
+                return jsonify({"message": f"{HEADER} was already used for a different request"}), 422
+            if row.status == "completed":
+                idempotent_requests.inc(outcome="replayed")
+                return _replay(row)
+            if not waiting:
+                waiting = _start_waiting((scope, key))
+                if not waiting:
+                    return _in_progress()  # Enough retries are waiting on it already
+            if time.monotonic() >= deadline:
+                return _in_progress()
+            time.sleep(POLL_INTERVAL_SECONDS)  # No connection is checked out while sleeping
+    finally:
+        if waiting:
+            _stop_waiting((scope, key))
+
+
+def _owned(scope, key, locked_at):
+    # Matches only while our claim stands, in case it was taken over as abandoned
+    return (table.c.scope == scope) & (table.c.key == key) & (table.c.locked_at == locked_at)
+
+
+def _release(scope, key, locked_at):
+    with db.engine.begin() as conn:
+        conn.execute(delete(table).where(_owned(scope, key, locked_at), table.c.status == "in_progress"))
+
+
+def _store_response(response):
+    claim = request.environ.pop(ENVIRON_KEY, None)
+    if claim is None:
+        return response
+    if response.status_code >= 500 or response.status_code in UNSTORED_STATUSES or response.is_streamed:
+        _release(*claim)
+        return response
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(table)
+            .where(_owned(*claim))
+            .values(
+                status="completed", response_status=response.status_code,
+                response_mimetype=response.mimetype, response_body=response.get_data(),
+            )
+        )
+    return response
+
+
+def _release_on_error(exc):
+    # Reached without _store_response having run, e.g. the view raised
+    claim = request.environ.pop(ENVIRON_KEY, None)
+    if claim is not None:
+        _release(*claim)
+
+
+def purge_expired_keys():
+    with db.engine.begin() as conn:
+        return conn.execute(delete(table).where(table.c.expires_at < datetime.utcnow())).rowcount
+
+
+def init_idempotency(app):
+    app.before_request(_handle_idempotency_key)
+    app.after_request(_store_response)
+    app.teardown_request(_release_on_error)
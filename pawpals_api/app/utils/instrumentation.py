@@ -0,0 +1,135 @@
+"""
+Per-request latency, response size and SQL instrumentation.
+
+Each request records its latency, status and response size per blueprint and
+endpoint, plus how many SQL statements it ran and how long they took (via
+SQLAlchemy cursor events). Statements slower than SLOW_QUERY_THRESHOLD_MS are
+logged. Streamed responses are recorded once the body has been sent, so the
+queries run while streaming are counted; they carry no SQL debug headers.
+Everything is exposed through the shared registry served at /metrics.
+"""
+
+import logging
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.metrics import REGISTRY
+
+slow_query_logger = logging.getLogger("pawpals.sql.slow")
+
+request_latency = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Request latency, including streaming the body",
+    ["blueprint", "endpoint", "method"],
+)
+requests_total = REGISTRY.counter(
+    "http_requests", "Requests handled, by status code", ["blueprint", "endpoint", "method", "status"]
+)
+response_size = REGISTRY.histogram(
+    "http_response_size_bytes",
+    "Response body size (streamed responses are not counted)",
+    ["blueprint", "endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+sql_queries_per_request = REGISTRY.histogram(
+    "sql_queries_per_request",
+    "SQL statements executed per request",
+    ["blueprint", "endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+sql_time_per_request = REGISTRY.histogram(
+    "sql_duration_per_request_seconds",
+    "Total time spent in SQL statements per request",
+    ["blueprint", "endpoint"],
+)
+slow_queries = REGISTRY.counter("sql_slow_queries", "Statements slower than SLOW_QUERY_THRESHOLD_MS", ["endpoint"])
+
+_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append((context, time.perf_counter()))
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its entry so the pooled connection doesn't keep it.
+    # Matching the execution context skips errors raised before the statement was timed, e.g. while compiling it.
+    conn = exception_context.connection
+    start_times = conn.info.get("query_start_time") if conn is not None else None
+    if start_times and start_times[-1][0] is exception_context.execution_context:
+        start_times.pop()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()[1]
+    if not has_request_context():
+        return
+    g.sql_query_count = g.get("sql_query_count", 0) + 1
+    g.sql_query_time = g.get("sql_query_time", 0.0) + elapsed
+
+    threshold_ms = current_app.config["SLOW_QUERY_THRESHOLD_MS"]
+    if threshold_ms and elapsed * 1000 >= threshold_ms:
+        endpoint = request.endpoint or "unmatched"
+        slow_queries.inc(endpoint=endpoint)
+        slow_query_logger.warning(
+            "Slow query (%.1f ms) in %s %s: %s", elapsed * 1000, request.method, endpoint, " ".join(statement.split())[:1000]
+        )
+
+
+def _install_sql_listeners():
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    # Listening on the Engine class covers the primary and every replica bind
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _listeners_installed = True
+
+
+def init_instrumentation(app):
+    if not app.config["METRICS_ENABLED"]:
+        return
+    _install_sql_listeners()
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start_time = time.perf_counter()
+        g.sql_query_count = 0
+        g.sql_query_time = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get("request_start_time")
+        if start is None:
+            return response
+        # Unmatched URLs share one label so scanners can't blow up the series count
+        labels = {"blueprint": request.blueprint or "app", "endpoint": request.endpoint or "unmatched"}
+        method = request.method
+        request_globals = g._get_current_object()
+
+        def record():
+            elapsed = time.perf_counter() - start
+            request_latency.observe(elapsed, method=method, **labels)
+            requests_total.inc(method=method, status=response.status_code, **labels)
+            sql_queries_per_request.observe(request_globals.sql_query_count, **labels)
+            sql_time_per_request.observe(request_globals.sql_query_time, **labels)
+
+        if response.is_streamed:
+            # Streamed bodies run their queries after this hook, so record once the stream is done
+            response.call_on_close(record)
+            return response
+
+        response_size.observe(response.calculate_content_length() or 0, **labels)
+        record()
+        if current_app.config["SQL_DEBUG_HEADERS"]:
+            # Not sent on streamed responses: headers go out before the body's queries run, so they would undercount
+            response.headers["X-SQL-Query-Count"] = str(g.sql_query_count)
+            response.headers["X-SQL-Time-Ms"] = f"{g.sql_query_time * 1000:.2f}"
+        return response
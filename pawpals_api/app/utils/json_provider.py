@@ -0,0 +1,59 @@
+"""
+JSON provider that encodes with orjson when it is installed.
+
+Models hand UUIDs, datetimes and Decimals straight to the encoder instead of
+converting every field to a string first. orjson handles UUID and datetime
+natively; the stdlib fallback produces the same ISO 8601 output.
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    return DefaultJSONProvider.default(o)
+
+
+if orjson is not None:
+    def dumps_bytes(obj, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=_default, option=option)
+else:
+    def dumps_bytes(obj, indent=False):
+        return json.dumps(obj, default=_default, indent=2 if indent else None).encode("utf-8")
+
+
+class PawPalsJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # Build the body as bytes directly, skipping the str round trip
+        return self._app.response_class(dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
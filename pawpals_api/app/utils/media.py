@@ -0,0 +1,240 @@
+"""
+Content-addressed image storage and thumbnails.
+
+Uploads are streamed to disk while being hashed, and stored under their SHA-256:
+
+    MEDIA_ROOT/ab/<sha256>/original
+    MEDIA_ROOT/ab/<sha256>/<size>.jpg      one per MEDIA_IMAGE_SIZES entry
+
+Uploading the same bytes twice stores them once. Because the path is derived
+from the content, the file behind a URL never changes and can be cached forever.
+Thumbnails are rendered in a process pool after the upload returns (Pillow is
+optional; without it only the original is served).
+
+Models keep plain URL strings. image_urls() turns a stored /media/<sha>/original
+URL into one URL per size, and leaves any other URL as the "original" entry.
+It takes the MEDIA_URL_PREFIX and size names as a MediaLinks, which the views
+read from the config with media_links() and pass to the models' to_dict(), so
+serializing a model doesn't depend on an app context being pushed.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Optional dependency, originals are served without thumbnails
+    Image = None
+
+ORIGINAL = "original"
+CHUNK_SIZE = 64 * 1024
+# Leading bytes of the formats we accept
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+_MEDIA_URL = re.compile(r"/([0-9a-f]{64})/" + ORIGINAL + r"$")
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# SHAs queued or rendering in this process's pool, so repeat requests don't queue them again
+_rendering = set()
+_rendering_pid = None
+
+# MEDIA_URL_PREFIX and the MEDIA_IMAGE_SIZES names, for building image URLs without the app config
+MediaLinks = namedtuple("MediaLinks", ["url_prefix", "sizes"])
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def sniff_mimetype(head):
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mimetype in SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+    return None
+
+
+def is_media_id(value):
+    return bool(_SHA256.match(value))
+
+
+def media_dir(sha):
+    return os.path.join(current_app.config["MEDIA_ROOT"], sha[:2], sha)
+
+
+def variant_path(sha, size):
+    if size == ORIGINAL:
+        return os.path.join(media_dir(sha), ORIGINAL)
+    return os.path.join(media_dir(sha), f"{size}.jpg")
+
+
+def media_links():
+    config = current_app.config
+    return MediaLinks(config["MEDIA_URL_PREFIX"], tuple(config["MEDIA_IMAGE_SIZES"]))
+
+
+def media_url(sha, size=ORIGINAL):
+    return f"{current_app.config['MEDIA_URL_PREFIX']}/{sha}/{size}"
+
+
+def image_urls(url, links):
+    """Size name -> URL for an image URL stored on a model; None if there's no image."""
+    if not url:
+        return None
+    match = _MEDIA_URL.search(url)
+    if not match:
+        return {ORIGINAL: url}  # External image, only available as-is
+    sha = match.group(1)
+    urls = {size: f"{links.url_prefix}/{sha}/{size}" for size in links.sizes}
+    urls[ORIGINAL] = f"{links.url_prefix}/{sha}/{ORIGINAL}"
+    return urls
+
+
+def store_upload(stream, max_bytes):
+    """
+    Stream an upload to content-addressed storage.
+
+    Returns (sha256, mimetype, created); mimetype is None for non-image data,
+    which is not kept. Raises UploadTooLarge past max_bytes.
+    """
+    root = current_app.config["MEDIA_ROOT"]
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    head = b""
+    size = 0
+    # Write to a temp file on the same filesystem so the final rename is atomic
+    fd, temp_path = tempfile.mkstemp(dir=root, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                if len(head) < 16:
+                    head += chunk[:16]
+                digest.update(chunk)
+                out.write(chunk)
+
+        mimetype = sniff_mimetype(head)
+        sha = digest.hexdigest()
+        if mimetype is None:
+            return sha, None, False
+        final_path = variant_path(sha, ORIGINAL)
+        if os.path.exists(final_path):
+            return sha, mimetype, False  # Same bytes already stored
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        return sha, mimetype, True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def render_thumbnails(original_path, targets, quality):
+    """Runs in the process pool: write one JPEG per (path, max edge) target."""
+    with Image.open(original_path) as image:
+        image = ImageOps.exif_transpose(image)  # Phone photos carry their rotation in EXIF
+        if image.mode not in ("RGB", "L"):
+            # JPEG has no alpha: flatten transparent images onto white
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+            image = background
+        for path, edge in targets:
+            if os.path.exists(path):
+                continue
+            thumbnail = image.copy()
+            thumbnail.thumbnail((edge, edge), Image.LANCZOS)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            thumbnail.save(temp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(temp_path, path)
+
+
+def _get_executor(max_workers):
+    global _executor, _executor_pid
+    with _executor_lock:
+        # A pool inherited across a fork is unusable, so each worker process starts its own
+        if _executor is None or _executor_pid != os.getpid():
+            # spawn: forking a process that runs request threads can copy held locks
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _claim_rendering(sha):
+    global _rendering_pid
+    with _executor_lock:
+        if _rendering_pid != os.getpid():
+            _rendering.clear()  # Inherited across a fork: those jobs belong to the parent's pool
+            _rendering_pid = os.getpid()
+        if sha in _rendering:
+            return False
+        _rendering.add(sha)
+        return True
+
+
+def _release_rendering(sha):
+    with _executor_lock:
+        _rendering.discard(sha)
+
+
+def _discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None  # The next job starts a fresh pool
+
+
+def schedule_thumbnails(sha):
+    """
+    Queue thumbnail rendering for a stored original, off the request thread. Never raises:
+    the original is stored either way, and GET /media falls back to it until thumbnails exist.
+    """
+    if Image is None:
+        return None
+    config = current_app.config
+    targets = [(variant_path(sha, size), edge) for size, edge in config["MEDIA_IMAGE_SIZES"].items()]
+    if all(os.path.exists(path) for path, _ in targets) or not _claim_rendering(sha):
+        return None
+    logger = current_app.logger
+    executor = None
+    try:
+        executor = _get_executor(config["MEDIA_THUMBNAIL_WORKERS"])
+        future = executor.submit(render_thumbnails, variant_path(sha, ORIGINAL), targets, config["MEDIA_JPEG_QUALITY"])
+    except Exception:
+        _release_rendering(sha)
+        if executor is not None:
+            _discard_executor(executor)  # e.g. BrokenProcessPool after a crashed child
+        logger.exception(f"Could not queue thumbnails for {sha}")
+        return None
+
+    def finished(done):
+        _release_rendering(sha)
+        if done.cancelled():
+            return
+        if done.exception() is not None:
+            if isinstance(done.exception(), BrokenProcessPool):
+                _discard_executor(executor)
+            logger.error(f"Thumbnailing {sha} failed: {done.exception()}")
+
+    future.add_done_callback(finished)
+    return future
@@ -0,0 +1,51 @@
+"""
+Worker lifecycle helpers for the production server (see gunicorn.conf.py).
+
+The app is created once in the master process and forked into workers. Pools
+must never be shared across a fork, so each worker drops the inherited pool
+state and then opens its own connections before taking traffic.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+
+def prepare_for_fork(app):
+    """Run in the master after create_app: do one-off work the workers can share."""
+    from app import db
+
+    # Mapper configuration is lazy; doing it once here saves every worker's first request
+    configure_mappers()
+    with app.app_context():
+        for engine in db.engines.values():
+            # Drop any connection the master opened so it isn't inherited by workers
+            engine.dispose()
+
+
+def warm_up_worker(app, connections):
+    """Run in each worker after fork: reset inherited pools and pre-open connections."""
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False leaves the parent's sockets alone and just forgets them
+            engine.dispose(close=False)
+            opened = []
+            try:
+                for _ in range(connections):
+                    connection = engine.connect()
+                    connection.execute(text("SELECT 1"))
+                    opened.append(connection)
+            finally:
+                # Returned connections stay in the pool, ready for the first requests
+                for connection in opened:
+                    connection.close()
+
+
+def shutdown_worker(app):
+    """Run when a worker exits, after in-flight requests have drained."""
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,37 @@
+"""
+Chunked JSON array responses for large result sets.
+
+Rows are pulled from the database in batches of JSON_STREAM_BATCH_SIZE
+(server-side cursors on PostgreSQL) and encoded as they arrive, so peak memory
+does not grow with the number of rows. The DB connection stays checked out
+until the client has read the whole response.
+"""
+
+from flask import Response, current_app, stream_with_context
+
+from app.utils.json_provider import dumps_bytes
+
+CHUNK_SIZE = 64 * 1024
+
+
+def stream_query(query):
+    """Iterate a query in batches instead of loading every row at once."""
+    return query.yield_per(current_app.config["JSON_STREAM_BATCH_SIZE"])
+
+
+def stream_json_array(items, serialize=lambda item: item.to_dict(), status=200):
+    def generate():
+        buffer = bytearray(b"[")
+        first = True
+        for item in items:
+            if not first:
+                buffer += b","
+            buffer += dumps_bytes(serialize(item))
+            first = False
+            if len(buffer) >= CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b"]\n"
+        yield bytes(buffer)
+
+    return Response(stream_with_context(generate()), status=status, mimetype="application/json")
@@ -0,0 +1,9 @@
+"""
+Load-test and benchmark suite for the PawPals API.
+
+    python -m benchmarks generate --db sqlite:///bench.db --scale small
+    python -m benchmarks run --db sqlite:///bench.db --out results/local.json
+    python -m benchmarks compare results/before.json results/after.json
+
+See benchmarks/README.md for the full set of options.
+"""
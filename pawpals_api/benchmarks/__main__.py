@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy.engine import make_url
+
+from app import create_app, db
+from benchmarks.datagen import SCALES, generate, resolve_scale
+from benchmarks.runner import HttpDriver, TestClientDriver, run_workloads
+from benchmarks.workloads import WORKLOADS, load_fixtures
+from config import Config
+
+
+def make_app(database_url):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQL_DEBUG_HEADERS = True
+        SLOW_QUERY_THRESHOLD_MS = 0
+
+    return create_app(BenchmarkConfig)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_generate(args):
+    app = make_app(args.db)
+    counts = resolve_scale(args.scale, {
+        "users": args.users, "dogs": args.dogs, "places": args.places, "playdates": args.playdates,
+        "reviews": args.reviews,
+    })
+    with app.app_context():
+        if args.create_schema:
+            db.create_all()
+        summary = generate(counts, seed=args.seed)
+    print(json.dumps(summary))
+
+
+def cmd_run(args):
+    app = make_app(args.db)
+    names = args.workloads or [name for name, (_, _, writes) in WORKLOADS.items() if args.include_writes or not writes]
+    unknown = [name for name in names if name not in WORKLOADS]
+    if unknown:
+        sys.exit(f"Unknown workloads: {', '.join(unknown)}")
+
+    with app.app_context():
+        fixtures = load_fixtures(sample_size=args.sample_users, seed=args.seed)
+
+    if args.base_url:
+        driver = HttpDriver(args.base_url, concurrency=args.concurrency)
+    else:
+        driver = TestClientDriver(app)
+    results = run_workloads(driver, fixtures, names, args.iterations, warmup=args.warmup, seed=args.seed)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "label": args.label,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "driver": driver.name,
+            "base_url": args.base_url,
+            "concurrency": driver.concurrency,
+            "database": make_url(args.db).render_as_string(hide_password=True),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    def change(old, new):
+        if old in (None, 0) or new is None:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"{'workload':<24} {'req/s':>18} {'p95 ms':>22} {'q/req':>14}")
+    for name, new in candidate["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        print(
+            f"{name:<24} "
+            f"{old['throughput_rps']:>8} -> {new['throughput_rps']:<8} "
+            f"{old['latency_ms']['p95']:>8} -> {new['latency_ms']['p95']:<8} {change(old['latency_ms']['p95'], new['latency_ms']['p95']):>7} "
+            f"{old['queries_per_request']['mean']} -> {new['queries_per_request']['mean']}"
+        )
+
+
+def main(argv=None):
+    default_db = os.environ.get("BENCHMARK_DATABASE_URL", "sqlite:////tmp/pawpals_bench.db")
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="PawPals API benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Bulk-insert a synthetic dataset")
+    gen.add_argument("--db", default=default_db, help="Database URL (default: %(default)s)")
+    gen.add_argument("--scale", choices=sorted(SCALES), default="small")
+    gen.add_argument("--users", type=int)
+    gen.add_argument("--dogs", type=int)
+    gen.add_argument("--places", type=int)
+    gen.add_argument("--playdates", type=int)
+    gen.add_argument("--reviews", type=int)
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--create-schema", action="store_true", help="Run db.create_all() first (SQLite stand-in)")
+    gen.set_defaults(func=cmd_generate)
+
+    run = sub.add_parser("run", help="Run workloads and report throughput and latency")
+    run.add_argument("--db", default=default_db, help="Database URL used to sample fixtures")
+    run.add_argument("--base-url", help="Benchmark a running server over HTTP instead of the Flask test client")
+    run.add_argument("--concurrency", type=int, default=8, help="HTTP driver threads")
+    run.add_argument("--iterations", type=int, default=200)
+    run.add_argument("--warmup", type=int, default=10)
+    run.add_argument("--sample-users", type=int, default=200)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--include-writes", action="store_true", help="Also run workloads that insert or update rows")
+    run.add_argument("--workload", dest="workloads", action="append", help="Run only this workload (repeatable)")
+    run.add_argument("--label", help="Free-form label stored in the report")
+    run.add_argument("--out", help="Write the JSON report here")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="Compare two JSON reports")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Synthetic data generator.
+
+Builds users around a handful of city centres, dogs with breeds, sizes and
+temperaments, places clustered around the same cities, a playdate history
+between dogs of the same city and place reviews. Output is deterministic for a given seed, and
+rows are bulk inserted BATCH_SIZE at a time.
+"""
+
+import itertools
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.models import Dog, Place, Playdate, Review, User
+from app.services.review_service import recompute_place_ratings
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+# Rows per table; each preset is roughly 15k, 150k and 1.5M rows in total
+SCALES = {
+    "small": {"users": 1_000, "dogs": 1_500, "places": 2_500, "playdates": 5_000, "reviews": 5_000},
+    "medium": {"users": 10_000, "dogs": 15_000, "places": 25_000, "playdates": 50_000, "reviews": 50_000},
+    "large": {"users": 100_000, "dogs": 150_000, "places": 250_000, "playdates": 500_000, "reviews": 500_000},
+}
+
+CITIES = [
+    ("Cape Town", "South Africa", -33.9249, 18.4241),
+    ("Johannesburg", "South Africa", -26.2041, 28.0473),
+    ("London", "United Kingdom", 51.5072, -0.1276),
+    ("Berlin", "Germany", 52.5200, 13.4050),
+    ("New York", "United States", 40.7128, -74.0060),
+    ("Toronto", "Canada", 43.6532, -79.3832),
+    ("Sydney", "Australia", -33.8688, 151.2093),
+    ("Paris", "France", 48.8566, 2.3522),
+]
+BREEDS = [
+    "Labrador Retriever", "German Shepherd", "Golden Retriever", "French Bulldog", "Beagle",
+    "Poodle", "Dachshund", "Border Collie", "Jack Russell Terrier", "Boxer", "Husky", "Mixed",
+]
+SIZES = ["small", "medium", "large"]
+TEMPERAMENTS = ["friendly", "playful", "calm", "energetic", "shy", "curious", "gentle", "protective", "social"]
+PLACE_TYPES = ["park", "cafe", "hotel", "beach", "restaurant", "store", "other"]
+# Skewed towards good reviews, like most review sites
+RATING_WEIGHTS = {1: 1, 2: 1, 3: 2, 4: 4, 5: 5}
+PAST_STATUSES = (["completed"] * 6) + (["declined"] * 2) + (["cancelled"] * 2)
+FUTURE_STATUSES = (["pending"] * 1) + (["accepted"] * 1)
+
+BATCH_SIZE = 5_000
+
+
+def resolve_scale(scale, overrides=None):
+    counts = dict(SCALES[scale])
+    counts.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    return counts
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _near(rng, lat, lon, spread_km):
+    # Gaussian jitter around a point; ~111 km per degree is close enough for test data
+    return lat + rng.gauss(0, spread_km / 111.0), lon + rng.gauss(0, spread_km / 111.0)
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+
+def generate(counts, seed=42, log=print):
+    """Insert a synthetic dataset into the current app's database and return a summary of it."""
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    # One hash for everyone: hashing per user would dominate generation time
+    password_hash = generate_password_hash(BENCHMARK_PASSWORD)
+
+    users = []
+    user_city = []
+    for index in range(counts["users"]):
+        city_index = rng.randrange(len(CITIES))
+        _, _, city_lat, city_lon = CITIES[city_index]
+        lat, lon = _near(rng, city_lat, city_lon, 8)
+        users.append({
+            "id": _uuid(rng),
+            "name": f"Benchmark User {index}",
+            "email": f"user{index}@bench.pawpals.test",
+            "password_hash": password_hash,
+            "location_latitude": lat,
+            "location_longitude": lon,
+        })
+        user_city.append(city_index)
+    _insert(User, users)
+    log(f"users: {len(users)}")
+
+    dogs = []
+    dogs_by_city = [[] for _ in CITIES]
+    for index in range(counts["dogs"]):
+        # Every user gets a dog before anyone gets a second one
+        owner_index = index if index < len(users) else rng.randrange(len(users))
+        dog_id = _uuid(rng)
+        dogs.append({
+            "id": dog_id,
+            "user_id": users[owner_index]["id"],
+            "name": f"Dog {index}",
+            "breed": rng.choice(BREEDS),
+            "age_years": rng.randint(0, 15),
+            "size": rng.choice(SIZES),
+            "temperament": rng.sample(TEMPERAMENTS, rng.randint(1, 3)),
+        })
+        dogs_by_city[user_city[owner_index]].append(dog_id)
+    _insert(Dog, dogs)
+    log(f"dogs: {len(dogs)}")
+
+    places = []
+    for index in range(counts["places"]):
+        city, country, city_lat, city_lon = rng.choice(CITIES)
+        # A few tight clusters (neighbourhoods) inside each city
+        lat, lon = _near(rng, city_lat, city_lon, rng.choice((1, 3, 10)))
+        places.append({
+            "id": _uuid(rng),
+            "name": f"Place {index}",
+            "type": rng.choice(PLACE_TYPES),
+            "address_street": f"{rng.randint(1, 999)} Benchmark Street",
+            "address_city": city,
+            "address_country": country,
+            "location_latitude": lat,
+            "location_longitude": lon,
+            "description": "Synthetic benchmark place",
+            "images_urls": [],
+            "added_by_user_id": users[rng.randrange(len(users))]["id"],
+            "is_verified": rng.random() < 0.3,
+        })
+    _insert(Place, places)
+    log(f"places: {len(places)}")
+
+    playdate_count = 0
+    cities_with_pairs = [city_dogs for city_dogs in dogs_by_city if len(city_dogs) >= 2]
+    batch = []
+    for _ in range(counts["playdates"] if cities_with_pairs else 0):
+        dog1_id, dog2_id = rng.sample(rng.choice(cities_with_pairs), 2)
+        # Two years of history plus the next two months
+        playdate_time = now + timedelta(minutes=rng.randint(-2 * 365 * 24 * 60, 60 * 24 * 60))
+        status = rng.choice(FUTURE_STATUSES if playdate_time > now else PAST_STATUSES)
+        batch.append({
+            "id": _uuid(rng),
+            "dog1_id": dog1_id,
+            "dog2_id": dog2_id,
+            "requester_dog_id": dog1_id,
+            "playdate_time": playdate_time,
+            "location_description": "Benchmark park",
+            "status": status,
+        })
+        if len(batch) >= BATCH_SIZE:
+            _insert(Playdate, batch)
+            playdate_count += len(batch)
+            batch = []
+    if batch:
+        _insert(Playdate, batch)
+        playdate_count += len(batch)
+    log(f"playdates: {playdate_count}")
+
+    # A few popular places collect most reviews; each user reviews a place at most once
+    review_pairs = set()
+    place_cum_weights = list(itertools.accumulate(rng.paretovariate(1.5) for _ in places))
+    target = min(counts.get("reviews", 0), len(users) * len(places))
+    while len(review_pairs) < target:
+        for place_index in rng.choices(range(len(places)), cum_weights=place_cum_weights, k=target - len(review_pairs)):
+            review_pairs.add((rng.randrange(len(users)), place_index))
+    ratings = list(RATING_WEIGHTS)
+    rating_weights = list(RATING_WEIGHTS.values())
+    review_rows = [{
+        "id": _uuid(rng),
+        "user_id": users[user_index]["id"],
+        "place_id": places[place_index]["id"],
+        "rating": rng.choices(ratings, weights=rating_weights, k=1)[0],
+        "comment": "Synthetic benchmark review",
+    } for user_index, place_index in sorted(review_pairs)]
+    _insert(Review, review_rows)
+    recompute_place_ratings()  # Fill in the places' rating aggregates in one statement
+    log(f"reviews: {len(review_rows)}")
+
+    return {
+        "users": len(users),
+        "dogs": len(dogs),
+        "places": len(places),
+        "playdates": playdate_count,
+        "reviews": len(review_rows),
+        "seed": seed,
+    }
@@ -0,0 +1,152 @@
+"""
+Drivers and statistics for benchmark runs.
+
+The test-client driver calls the app in-process, one request at a time, which
+isolates server-side cost, and counts SQL statements with engine events. The
+HTTP driver sends requests to a running server from a thread pool, which
+measures the serving stack under concurrency; its queries per request come from
+the X-SQL-Query-Count header (start the server with SQL_DEBUG_HEADERS=1).
+Streamed responses don't carry it, so they are left out of that figure.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.workloads import WORKLOADS
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _headers(spec):
+    headers = dict(spec.get("headers") or {})
+    user = spec.get("user")
+    if user:
+        headers["Authorization"] = f"Bearer {user['token']}"
+    return headers
+
+
+def _sample(status, elapsed, body_size, queries):
+    return {
+        "status": status,
+        "latency": elapsed,
+        "bytes": body_size,
+        "queries": queries,
+    }
+
+
+class TestClientDriver:
+    name = "testclient"
+    concurrency = 1
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.query_count = 0
+        event.listen(Engine, "after_cursor_execute", self._count_query)
+
+    def _count_query(self, *args):
+        self.query_count += 1
+
+    def send(self, spec):
+        self.query_count = 0
+        start = time.perf_counter()
+        response = self.client.open(spec["path"], method=spec["method"], json=spec.get("json"), headers=_headers(spec))
+        body = response.get_data()  # Drains streamed responses too
+        elapsed = time.perf_counter() - start
+        return _sample(response.status_code, elapsed, len(body), self.query_count)
+
+    def run(self, specs):
+        return [self.send(spec) for spec in specs]
+
+
+class HttpDriver:
+    name = "http"
+
+    def __init__(self, base_url, concurrency=8, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, spec):
+        start = time.perf_counter()
+        response = self._session().request(
+            spec["method"], self.base_url + spec["path"], json=spec.get("json"), headers=_headers(spec), timeout=self.timeout
+        )
+        body = response.content
+        elapsed = time.perf_counter() - start
+        queries = response.headers.get("X-SQL-Query-Count")
+        return _sample(response.status_code, elapsed, len(body), int(queries) if queries is not None else None)
+
+    def run(self, specs):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(self.send, specs))
+
+
+def summarize(samples, wall_time):
+    latencies = sorted(sample["latency"] for sample in samples)
+    queries = sorted(sample["queries"] for sample in samples if sample["queries"] is not None)
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample["status"] >= 400),
+        "statuses": statuses,
+        "throughput_rps": round(len(samples) / wall_time, 2) if wall_time else None,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1]) if latencies else None,
+        },
+        "queries_per_request": {
+            "mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "p95": percentile(queries, 95),
+            "max": queries[-1] if queries else None,
+        },
+        "mean_response_bytes": round(sum(sample["bytes"] for sample in samples) / len(samples)) if samples else None,
+    }
+
+
+def run_workloads(driver, fixtures, names, iterations, warmup=10, seed=42, log=print):
+    """Run each named workload and return {name: summary}."""
+    results = {}
+    for name in names:
+        blueprint, build, _ = WORKLOADS[name]
+        # A fresh generator per workload keeps request sequences identical across runs
+        rng = random.Random(f"{seed}:{name}")
+        driver.run([build(rng, fixtures) for _ in range(warmup)])
+        specs = [build(rng, fixtures) for _ in range(iterations)]
+        start = time.perf_counter()
+        samples = driver.run(specs)
+        wall_time = time.perf_counter() - start
+        results[name] = {"blueprint": blueprint, **summarize(samples, wall_time)}
+        summary = results[name]
+        log(
+            f"{name:<24} {summary['throughput_rps']:>9} req/s  p50 {summary['latency_ms']['p50']:>8} ms  "
+            f"p95 {summary['latency_ms']['p95']:>8} ms  p99 {summary['latency_ms']['p99']:>8} ms  "
+            f"q/req {summary['queries_per_request']['mean']}  errors {summary['errors']}"
+        )
+    return results
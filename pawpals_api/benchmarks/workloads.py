@@ -0,0 +1,229 @@
+"""
+Scripted workloads, one or more per blueprint.
+
+Each workload turns (rng, fixtures) into a request spec: method, path, an
+optional JSON body and extra headers, and optionally the sampled user whose token to send. Fixtures are
+sampled from whatever dataset is in the database when the run starts.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import or_
+
+from app import db
+from app.models.models import Dog, Place, Playdate, User
+from app.services.sync_service import encode_token
+from benchmarks.datagen import BENCHMARK_PASSWORD, CITIES, PLACE_TYPES, SIZES
+
+SYNC_CURSORS = ("users", "dogs", "places", "playdates", "tombstones")
+
+
+class Fixtures:
+    def __init__(self, users, place_ids, playdates, sync_token=None):
+        self.users = users          # [{"id", "email", "token", "dog_ids"}]
+        self.place_ids = place_ids
+        self.playdates = playdates  # [(playdate_id, owner user dict)]
+        self.sync_token = sync_token  # Caught up with the dataset as loaded
+
+
+def load_fixtures(sample_size=200, seed=42):
+    """Sample users, dogs, places and playdates from the database. Needs an app context."""
+    rng = random.Random(seed)
+    users = []
+    playdates = []
+    owners = (
+        db.session.query(User.id, User.email)
+        .filter(User.id.in_(db.session.query(Dog.user_id)))
+        .order_by(User.email)
+        .limit(sample_size * 5)
+        .all()
+    )
+    for user_id, email in rng.sample(owners, min(sample_size, len(owners))):
+        dog_ids = [dog_id for (dog_id,) in db.session.query(Dog.id).filter(Dog.user_id == user_id)]
+        playdate = (
+            db.session.query(Playdate.id)
+            .filter(or_(Playdate.dog1_id.in_(dog_ids), Playdate.dog2_id.in_(dog_ids)))
+            .first()
+        )
+        user = {
+            "id": str(user_id),
+            "email": email,
+            "token": create_access_token(identity=str(user_id), expires_delta=timedelta(days=1)),
+            "dog_ids": [str(dog_id) for dog_id in dog_ids],
+        }
+        users.append(user)
+        if playdate is not None:
+            playdates.append((str(playdate[0]), user))
+    if not users:
+        raise RuntimeError("No users with dogs found; run `python -m benchmarks generate` first")
+
+    place_ids = [str(place_id) for (place_id,) in db.session.query(Place.id).order_by(Place.id).limit(sample_size * 5)]
+    newest = max(
+        db.session.query(db.func.max(model.updated_at)).scalar() or datetime.min for model in (User, Dog, Place, Playdate)
+    )
+    sync_token = encode_token({name: (newest, None) for name in SYNC_CURSORS}, newest)
+    db.session.rollback()
+    return Fixtures(users, place_ids, playdates, sync_token)
+
+
+def _user(rng, fx):
+    return rng.choice(fx.users)
+
+
+def _point(rng):
+    _, _, lat, lon = rng.choice(CITIES)
+    return lat + rng.uniform(-0.05, 0.05), lon + rng.uniform(-0.05, 0.05)
+
+
+def health(rng, fx):
+    return {"method": "GET", "path": "/health"}
+
+
+def auth_login(rng, fx):
+    user = _user(rng, fx)
+    return {"method": "POST", "path": "/api/auth/login", "json": {"email": user["email"], "password": BENCHMARK_PASSWORD}}
+
+
+def auth_me(rng, fx):
+    return {"method": "GET", "path": "/api/auth/me", "user": _user(rng, fx)}
+
+
+def dogs_list(rng, fx):
+    return {"method": "GET", "path": "/api/dogs", "user": _user(rng, fx)}
+
+
+def dogs_detail(rng, fx):
+    user = _user(rng, fx)
+    return {"method": "GET", "path": f"/api/dogs/{rng.choice(user['dog_ids'])}", "user": user}
+
+
+def dogs_create(rng, fx):
+    body = {"name": f"Bench Dog {rng.randrange(10**6)}", "breed": "Mixed", "age_years": rng.randint(0, 15),
+            "size": rng.choice(SIZES), "temperament": ["friendly"]}
+    return {"method": "POST", "path": "/api/dogs", "json": body, "user": _user(rng, fx)}
+
+
+def dogs_update(rng, fx):
+    user = _user(rng, fx)
+    return {"method": "PUT", "path": f"/api/dogs/{rng.choice(user['dog_ids'])}",
+            "json": {"age_years": rng.randint(0, 15)}, "user": user}
+
+
+def dogs_create_retry(rng, fx):
+    # A client retrying the same create: after each user's first call, responses are replayed
+    user = _user(rng, fx)
+    return {"method": "POST", "path": "/api/dogs", "json": {"name": "Retried Dog"}, "user": user,
+            "headers": {"Idempotency-Key": f"bench-{user['id']}"}}
+
+
+def places_list(rng, fx):
+    return {"method": "GET", "path": f"/api/places?page={rng.randint(1, 20)}&per_page=20"}
+
+
+def places_list_category(rng, fx):
+    return {"method": "GET", "path": f"/api/places?category={rng.choice(PLACE_TYPES)}&per_page=20"}
+
+
+def places_nearby(rng, fx):
+    lat, lon = _point(rng)
+    return {"method": "GET", "path": f"/api/places/nearby?latitude={lat}&longitude={lon}&radius=5"}
+
+
+def places_top_rated(rng, fx):
+    return {"method": "GET", "path": f"/api/places?sort=top_rated&category={rng.choice(PLACE_TYPES)}&per_page=20"}
+
+
+def places_nearby_top_rated(rng, fx):
+    lat, lon = _point(rng)
+    return {"method": "GET", "path": f"/api/places/nearby?latitude={lat}&longitude={lon}&radius=5&sort=top_rated&limit=20"}
+
+
+def places_detail(rng, fx):
+    return {"method": "GET", "path": f"/api/places/{rng.choice(fx.place_ids)}"}
+
+
+def places_create(rng, fx):
+    # Coordinates are always supplied so the benchmark never calls out to Nominatim
+    lat, lon = _point(rng)
+    body = {"name": f"Bench Place {rng.randrange(10**6)}", "type": rng.choice(PLACE_TYPES),
+            "location_latitude": lat, "location_longitude": lon}
+    return {"method": "POST", "path": "/api/places", "json": body, "user": _user(rng, fx)}
+
+
+def playdates_user(rng, fx):
+    return {"method": "GET", "path": "/api/playdates/user", "user": _user(rng, fx)}
+
+
+def playdates_dog_upcoming(rng, fx):
+    user = _user(rng, fx)
+    return {"method": "GET", "path": f"/api/playdates/dog/{rng.choice(user['dog_ids'])}?status=upcoming", "user": user}
+
+
+def playdates_detail(rng, fx):
+    playdate_id, user = rng.choice(fx.playdates)
+    return {"method": "GET", "path": f"/api/playdates/{playdate_id}", "user": user}
+
+
+def playdates_history(rng, fx):
+    return {"method": "GET", "path": "/api/playdates/history", "user": _user(rng, fx)}
+
+
+def playdates_create(rng, fx):
+    user = _user(rng, fx)
+    other = rng.choice([candidate for candidate in fx.users if candidate is not user] or [user])
+    requester = rng.choice(user["dog_ids"])
+    partner = rng.choice([dog_id for dog_id in other["dog_ids"] if dog_id != requester] or [requester])
+    when = datetime.utcnow() + timedelta(days=rng.randint(1, 30))
+    body = {"dog1_id": requester, "dog2_id": partner, "requester_dog_id": requester,
+            "playdate_time": when.replace(microsecond=0).isoformat()}
+    return {"method": "POST", "path": "/api/playdates", "json": body, "user": user}
+
+
+def batch_startup(rng, fx):
+    # The mobile client's launch sequence collapsed into a single round trip
+    user = _user(rng, fx)
+    requests = [
+        {"id": "me", "path": "/api/auth/me"},
+        {"id": "dogs", "path": "/api/dogs"},
+        {"id": "playdates", "path": "/api/playdates/user"},
+    ] + [{"id": f"dog:{dog_id}", "path": f"/api/dogs/{dog_id}"} for dog_id in user["dog_ids"][:3]]
+    return {"method": "POST", "path": "/api/batch", "json": {"requests": requests}, "user": user}
+
+
+def sync_full(rng, fx):
+    return {"method": "GET", "path": "/api/sync", "user": _user(rng, fx)}
+
+
+def sync_delta(rng, fx):
+    # A client that is already caught up: steady-state traffic, mostly empty changesets
+    return {"method": "GET", "path": f"/api/sync?since={fx.sync_token}", "user": _user(rng, fx)}
+
+
+# name -> (blueprint, builder, writes data)
+WORKLOADS = {
+    "health": ("app", health, False),
+    "auth.login": ("auth", auth_login, False),
+    "auth.me": ("auth", auth_me, False),
+    "dogs.list": ("dogs", dogs_list, False),
+    "dogs.detail": ("dogs", dogs_detail, False),
+    "dogs.create": ("dogs", dogs_create, True),
+    "dogs.update": ("dogs", dogs_update, True),
+    "dogs.create_retry": ("dogs", dogs_create_retry, True),
+    "places.list": ("places", places_list, False),
+    "places.list_category": ("places", places_list_category, False),
+    "places.nearby": ("places", places_nearby, False),
+    "places.top_rated": ("places", places_top_rated, False),
+    "places.nearby_top_rated": ("places", places_nearby_top_rated, False),
+    "places.detail": ("places", places_detail, False),
+    "places.create": ("places", places_create, True),
+    "playdates.user": ("playdates", playdates_user, False),
+    "playdates.dog_upcoming": ("playdates", playdates_dog_upcoming, False),
+    "playdates.detail": ("playdates", playdates_detail, False),
+    "playdates.history": ("playdates", playdates_history, False),
+    "playdates.create": ("playdates", playdates_create, True),
+    "sync.full": ("sync", sync_full, False),
+    "sync.delta": ("sync", sync_delta, False),
+    "batch.startup": ("batch", batch_startup, False),
+}
@@ -4,6 +4,12 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, ".env"))
 
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or "you-will-never-guess"
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or \
@@ -13,3 +19,71 @@ class Config:
     # Add other configurations as needed, e.g., for mail, Nominatim API URL
     NOMINATIM_API_URL = "https://nominatim.openstreetmap.org"
 
+    # Connection pool tuning (applied to the primary and every replica engine)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 10)) # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800)) # Seconds before a connection is replaced
+    DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 15000)) # 0 disables the timeout
+
+    # Comma-separated read replica URIs. GET/HEAD handlers read from these when set.
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    # After a client writes, its reads stay on the primary for this long to hide replication lag. Writes answer
+    # with an X-PawPals-Last-Write header (and cookie); clients without a cookie jar should echo the header back.
+    DB_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
+    # Request/SQL instrumentation exposed at /metrics
+    METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+    # /metrics answers only to these addresses/networks (comma-separated), or to "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()]
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN") # Unset disables token access
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 250)) # 0 disables slow-query logging
+    # Adds X-SQL-Query-Count / X-SQL-Time-Ms headers to non-streamed responses (handy for benchmarks, leave off in production)
+    SQL_DEBUG_HEADERS = _env_bool("SQL_DEBUG_HEADERS", False)
+
+    # Rows fetched per round trip when streaming large JSON lists
+    JSON_STREAM_BATCH_SIZE = int(os.environ.get("JSON_STREAM_BATCH_SIZE", 500))
+
+    # POST /api/batch limits
+    BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", 20))
+    BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", 4)) # Threads for concurrent GET sub-requests (1 disables)
+
+    # GET /api/sync (delta sync)
+    SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", 500)) # Max changed rows per entity type per call
+    # Rows younger than this wait for the next sync. On PostgreSQL, rows of still-open transactions wait too, however old.
+    SYNC_SAFETY_LAG_SECONDS = int(os.environ.get("SYNC_SAFETY_LAG_SECONDS", 2))
+    # Tombstones are purged after this long (flask purge-tombstones); older tokens get a full resync
+    SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+    # Idempotency-Key handling for POST requests
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 86400)) # How long responses are replayable
+    IDEMPOTENCY_WAIT_SECONDS = int(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", 10)) # Max wait on an in-flight duplicate before 409
+    IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", 120)) # After this an in-flight claim counts as abandoned
+    IDEMPOTENCY_MAX_WAITERS = int(os.environ.get("IDEMPOTENCY_MAX_WAITERS", 2)) # Retries per key and worker that wait; more get 409
+
+    # Purging soft-deleted users and dogs
+    PURGE_IN_BACKGROUND = _env_bool("PURGE_IN_BACKGROUND", True) # Off: run `flask purge-deleted` from cron instead
+    PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", 500)) # Rows deleted per transaction
+    PURGE_INTERVAL_SECONDS = int(os.environ.get("PURGE_INTERVAL_SECONDS", 300)) # Background re-check interval
+
+    # Uploaded images (POST /api/media, served from /media/<sha256>/<size>)
+    MEDIA_ROOT = os.environ.get("MEDIA_ROOT") or os.path.join(basedir, "media")
+    MEDIA_URL_PREFIX = os.environ.get("MEDIA_URL_PREFIX", "/media") # Point at a CDN that fronts /media if you have one
+    MEDIA_MAX_UPLOAD_BYTES = int(os.environ.get("MEDIA_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+    # Werkzeug rejects any larger request body with 413 before a view reads it (the margin covers multipart framing)
+    MAX_CONTENT_LENGTH = MEDIA_MAX_UPLOAD_BYTES + 64 * 1024
+    MEDIA_IMAGE_SIZES = {"thumb": 96, "small": 320, "medium": 800} # Thumbnail name -> longest edge in pixels
+    MEDIA_JPEG_QUALITY = int(os.environ.get("MEDIA_JPEG_QUALITY", 82))
+    MEDIA_THUMBNAIL_WORKERS = int(os.environ.get("MEDIA_THUMBNAIL_WORKERS", 2)) # Render processes per app process; gunicorn runs workers x this
+
+    # Place ratings: rating_score is the Bayesian average (weight * mean + sum of ratings) / (weight + number of reviews).
+    # A place needs about REVIEW_PRIOR_WEIGHT reviews before its own ratings outweigh the prior.
+    # Run `flask recompute-place-ratings` after changing these.
+    REVIEW_PRIOR_MEAN = float(os.environ.get("REVIEW_PRIOR_MEAN", 3.0))
+    REVIEW_PRIOR_WEIGHT = int(os.environ.get("REVIEW_PRIOR_WEIGHT", 5))
+
+    # Playdates are range-partitioned by month on playdate_time (PostgreSQL, see partition_playdates.sql)
+    PLAYDATE_PARTITION_MONTHS_AHEAD = int(os.environ.get("PLAYDATE_PARTITION_MONTHS_AHEAD", 6)) # flask create-playdate-partitions
+    # flask archive-playdates moves months older than this into playdates_archive (GET /api/playdates/history)
+    PLAYDATE_ARCHIVE_AFTER_MONTHS = int(os.environ.get("PLAYDATE_ARCHIVE_AFTER_MONTHS", 12))
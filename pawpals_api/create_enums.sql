@@ -1,33 +1,41 @@
--- SQL script to create or update the required enum types for PawPals
-
--- Drop existing enum types if they exist (for re-running the script)
-DROP TYPE IF EXISTS dog_size_enum CASCADE;
-DROP TYPE IF EXISTS place_type_enum CASCADE;
-DROP TYPE IF EXISTS playdate_status_enum CASCADE;
+-- SQL script to create the required enum types for PawPals
+-- The values must match app/models/enums.py. Safe to re-run: existing types are left alone
+-- (the old DROP TYPE ... CASCADE would also drop every column using them).
+-- To convert an existing database whose columns are still VARCHAR, run migrate_enums.sql afterwards.
 
 -- Create dog size enum
-CREATE TYPE dog_size_enum AS ENUM ('small', 'medium', 'large');
+DO $$ BEGIN
+    CREATE TYPE dog_size_enum AS ENUM ('small', 'medium', 'large');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
 
 -- Create place type enum
-CREATE TYPE place_type_enum AS ENUM (
-    'park',
-    'cafe',
-    'hotel',
-    'beach',
-    'restaurant',
-    'store',
-    'other'
-);
+DO $$ BEGIN
+    CREATE TYPE place_type_enum AS ENUM (
+        'park',
+        'cafe',
+        'hotel',
+        'beach',
+        'restaurant',
+        'store',
+        'other'
+    );
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
 
 -- Create playdate status enum
-CREATE TYPE playdate_status_enum AS ENUM (
-    'pending',
-    'accepted',
-    'declined',
-    'canceled'
-);
+DO $$ BEGIN
+    CREATE TYPE playdate_status_enum AS ENUM (
+        'pending',
+        'accepted',
+        'declined',
+        'cancelled',
+        'completed'
+    );
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
 
 -- Comment on the enum types for documentation
 COMMENT ON TYPE dog_size_enum IS 'Valid dog sizes: small, medium, large';
 COMMENT ON TYPE place_type_enum IS 'Valid place types: park, cafe, hotel, beach, restaurant, store, other';
-COMMENT ON TYPE playdate_status_enum IS 'Valid playdate statuses: pending, accepted, declined, canceled';
+COMMENT ON TYPE playdate_status_enum IS 'Valid playdate statuses: pending, accepted, declined, cancelled, completed';
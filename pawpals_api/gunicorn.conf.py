@@ -0,0 +1,86 @@
+# Production server configuration: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Signals (sent to the master process):
+#   HUP   re-read this file and replace workers gracefully (app code stays as preloaded)
+#   USR2  start a new master with fresh code, then send TERM to the old master for a zero-downtime deploy
+#   TERM  graceful shutdown: stop accepting, drain in-flight requests for up to graceful_timeout
+#   TTIN / TTOU  add / remove one worker
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Threaded workers: requests spend most of their time waiting on PostgreSQL,
+# so a few threads per process use the CPU better than more processes would.
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+# Each worker has its own pool, so size it from the worker's threads unless set explicitly: a connection
+# per request thread, plus a little overflow for batch sub-request threads and the purge thread.
+# Keep workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below PostgreSQL's max_connections (100 by default).
+# Every worker also starts its own thumbnail process pool, so a host runs workers * MEDIA_THUMBNAIL_WORKERS
+# render processes (each holding a decoded image while it works); one per worker already gives one per core or more.
+#
+# These reach the app through the environment, which only works because nothing imports config.py before
+# gunicorn has loaded this file: Config reads the environment when its class body runs, and the app (and
+# with it config.py) is first imported when preload_app loads wsgi:app, after this file. when_ready checks
+# that the app really got these values, in case a future import here breaks that order.
+worker_defaults = {
+    "DB_POOL_SIZE": threads,
+    "DB_MAX_OVERFLOW": min(threads, 4),
+    "MEDIA_THUMBNAIL_WORKERS": 1,
+}
+for name, value in worker_defaults.items():
+    os.environ.setdefault(name, str(value))
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Recycle workers now and then so slow leaks can't accumulate; jitter avoids restarting all at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+warm_connections = int(os.environ.get("DB_POOL_WARM_CONNECTIONS", threads))
+
+
+def when_ready(server):
+    from app.utils.serving import prepare_for_fork
+    from wsgi import app
+    prepare_for_fork(app)
+    for name in worker_defaults:
+        if app.config[name] != int(os.environ[name]):
+            server.log.warning(
+                f"{name} is {app.config[name]}, not {os.environ[name]}: config.py was imported before gunicorn.conf.py set it"
+            )
+    per_worker = app.config["DB_POOL_SIZE"] + app.config["DB_MAX_OVERFLOW"]
+    server.log.info(
+        f"Up to {workers * per_worker} connections per database ({workers} workers x {per_worker}); "
+        "keep this below PostgreSQL's max_connections"
+    )
+    server.log.info(
+        f"Up to {workers * app.config['MEDIA_THUMBNAIL_WORKERS']} thumbnail render processes "
+        f"({workers} workers x {app.config['MEDIA_THUMBNAIL_WORKERS']})"
+    )
+
+
+def post_fork(server, worker):
+    from app.utils.serving import warm_up_worker
+    from wsgi import app
+    try:
+        warm_up_worker(app, warm_connections)
+    except Exception as e:
+        # A cold pool is slower, not broken; let the worker start and connect lazily
+        server.log.warning(f"Worker {worker.pid} could not warm the DB pool: {e}")
+
+
+def worker_exit(server, worker):
+    from app.utils.serving import shutdown_worker
+    from wsgi import app
+    shutdown_worker(app)
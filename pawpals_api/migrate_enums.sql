@@ -0,0 +1,37 @@
+-- Converts dogs.size, places.type and playdates.status from VARCHAR to the native enum types.
+-- Run once on an existing database, after create_enums.sql:
+--     psql "$DATABASE_URL" -f create_enums.sql -f migrate_enums.sql
+-- Safe to re-run. Rows with values outside app/models/enums.py are normalized first: sizes become NULL,
+-- place types 'other', other statuses (including 'canceled') 'cancelled'.
+
+-- 1. Bring a playdate_status_enum created by an older create_enums.sql up to date.
+--    New enum values must be committed before they can be used, so this runs outside the transaction below.
+DO $$ BEGIN
+    IF EXISTS (SELECT 1 FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid
+               WHERE t.typname = 'playdate_status_enum' AND e.enumlabel = 'canceled') THEN
+        ALTER TYPE playdate_status_enum RENAME VALUE 'canceled' TO 'cancelled';
+    END IF;
+END $$;
+ALTER TYPE playdate_status_enum ADD VALUE IF NOT EXISTS 'completed';
+
+-- 2. Normalize the data and switch the column types, skipping columns that are already enums.
+--    A DO block runs as one transaction. Indexes on the columns are rebuilt as enum indexes.
+DO $$ BEGIN
+    IF (SELECT data_type FROM information_schema.columns WHERE table_name = 'dogs' AND column_name = 'size') <> 'USER-DEFINED' THEN
+        UPDATE dogs SET size = lower(trim(size)) WHERE size <> lower(trim(size));
+        UPDATE dogs SET size = NULL WHERE size NOT IN ('small', 'medium', 'large');
+        ALTER TABLE dogs ALTER COLUMN size TYPE dog_size_enum USING size::dog_size_enum;
+    END IF;
+
+    IF (SELECT data_type FROM information_schema.columns WHERE table_name = 'places' AND column_name = 'type') <> 'USER-DEFINED' THEN
+        UPDATE places SET type = lower(trim(type)) WHERE type <> lower(trim(type));
+        UPDATE places SET type = 'other' WHERE type NOT IN ('park', 'cafe', 'hotel', 'beach', 'restaurant', 'store', 'other');
+        ALTER TABLE places ALTER COLUMN type TYPE place_type_enum USING type::place_type_enum;
+    END IF;
+
+    IF (SELECT data_type FROM information_schema.columns WHERE table_name = 'playdates' AND column_name = 'status') <> 'USER-DEFINED' THEN
+        UPDATE playdates SET status = lower(trim(status)) WHERE status <> lower(trim(status));
+        UPDATE playdates SET status = 'cancelled' WHERE status NOT IN ('pending', 'accepted', 'declined', 'cancelled', 'completed');
+        ALTER TABLE playdates ALTER COLUMN status TYPE playdate_status_enum USING status::playdate_status_enum;
+    END IF;
+END $$;
@@ -0,0 +1,56 @@
+-- Brings a database created before place reviews up to date: creates the reviews table, replaces the user-written
+-- places.rating with the aggregates app/services/review_service.py maintains (rating_sum, rating_count and the
+-- Bayesian rating_score), adds their indexes and the location index GET /api/places/nearby uses, and backfills the
+-- aggregates from the reviews.
+-- Run once on an existing database, after migrate_soft_delete.sql:
+--     psql "$DATABASE_URL" -f migrate_place_ratings.sql
+-- The backfill uses the default REVIEW_PRIOR_MEAN (3.0) and REVIEW_PRIOR_WEIGHT (5). If you changed them, pass the same
+-- values, e.g. -v prior_mean=3.5 -v prior_weight=10, or run `flask recompute-place-ratings` afterwards.
+-- Safe to re-run: the backfill recomputes every place from its reviews. It updates every place row, so run it in a
+-- quiet period. The old places.rating column is dropped; it held no review count to carry over.
+
+\if :{?prior_mean}
+\else
+    \set prior_mean 3.0
+\endif
+\if :{?prior_weight}
+\else
+    \set prior_weight 5
+\endif
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS reviews (
+    id uuid PRIMARY KEY,
+    place_id uuid NOT NULL REFERENCES places (id) ON DELETE CASCADE,
+    user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    rating smallint NOT NULL,
+    comment text,
+    created_at timestamp without time zone DEFAULT now(),
+    updated_at timestamp without time zone DEFAULT now(),
+    CONSTRAINT uq_reviews_user_id_place_id UNIQUE (user_id, place_id),
+    CONSTRAINT check_review_rating_range CHECK (rating BETWEEN 1 AND 5)
+);
+CREATE INDEX IF NOT EXISTS ix_reviews_user_id ON reviews (user_id);
+CREATE INDEX IF NOT EXISTS ix_reviews_place_id_created_at ON reviews (place_id, created_at);
+
+ALTER TABLE places DROP COLUMN IF EXISTS rating;
+ALTER TABLE places ADD COLUMN IF NOT EXISTS rating_sum integer NOT NULL DEFAULT 0;
+ALTER TABLE places ADD COLUMN IF NOT EXISTS rating_count integer NOT NULL DEFAULT 0;
+ALTER TABLE places ADD COLUMN IF NOT EXISTS rating_score double precision NOT NULL DEFAULT 3.0;
+
+UPDATE places SET
+    rating_sum = coalesce(totals.rating_sum, 0),
+    rating_count = coalesce(totals.rating_count, 0),
+    rating_score = (:prior_weight * :prior_mean + coalesce(totals.rating_sum, 0))::double precision
+                   / (:prior_weight + coalesce(totals.rating_count, 0))
+FROM places AS p
+LEFT JOIN (SELECT place_id, sum(rating) AS rating_sum, count(*) AS rating_count FROM reviews GROUP BY place_id) AS totals
+    ON totals.place_id = p.id
+WHERE places.id = p.id;
+
+CREATE INDEX IF NOT EXISTS ix_places_rating_score ON places (rating_score);
+CREATE INDEX IF NOT EXISTS ix_places_type_rating_score ON places (type, rating_score);
+CREATE INDEX IF NOT EXISTS ix_places_location ON places (location_latitude, location_longitude);
+
+COMMIT;
@@ -0,0 +1,54 @@
+-- Brings a database created before soft delete up to date: adds users.deleted_at and dogs.deleted_at with their
+-- partial indexes, and recreates the foreign keys with the ON DELETE rules the purge job relies on
+-- (app/services/purge_service.py deletes users and dogs and lets the database remove their rows elsewhere).
+-- Run once on an existing database, before the app version that soft-deletes:
+--     psql "$DATABASE_URL" -f migrate_soft_delete.sql
+-- Safe to re-run. Recreating a foreign key checks every row of its table under a lock, so run it in a quiet period.
+
+-- 1. Soft-delete columns. Only the rows awaiting the purge are indexed; a full index from an earlier run is replaced.
+DO $$
+DECLARE
+    tbl text;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['users', 'dogs'] LOOP
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS deleted_at timestamp without time zone', tbl);
+        IF EXISTS (SELECT 1 FROM pg_indexes WHERE tablename = tbl AND indexname = 'ix_' || tbl || '_deleted_at'
+                   AND indexdef NOT LIKE '%WHERE%') THEN
+            EXECUTE format('DROP INDEX %I', 'ix_' || tbl || '_deleted_at');
+        END IF;
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (deleted_at) WHERE deleted_at IS NOT NULL',
+                       'ix_' || tbl || '_deleted_at', tbl);
+    END LOOP;
+END $$;
+
+-- 2. Foreign keys. Each one whose ON DELETE rule differs (or that is missing) is dropped and added again.
+--    confdeltype codes: 'c' CASCADE, 'n' SET NULL.
+DO $$
+DECLARE
+    fk record;
+    existing record;
+BEGIN
+    FOR fk IN SELECT * FROM (VALUES
+        ('dogs', 'user_id', 'users', 'CASCADE', 'c'),
+        ('places', 'added_by_user_id', 'users', 'SET NULL', 'n'),
+        ('playdates', 'dog1_id', 'dogs', 'CASCADE', 'c'),
+        ('playdates', 'dog2_id', 'dogs', 'CASCADE', 'c'),
+        ('playdates', 'requester_dog_id', 'dogs', 'CASCADE', 'c')
+    ) AS t (tbl, col, ref, action, code) LOOP
+        existing := NULL;
+        SELECT c.conname, c.confdeltype INTO existing
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        WHERE c.contype = 'f' AND c.conrelid = fk.tbl::regclass AND c.confrelid = fk.ref::regclass
+          AND cardinality(c.conkey) = 1 AND a.attname = fk.col;
+
+        IF existing.confdeltype IS DISTINCT FROM fk.code THEN
+            IF existing.conname IS NOT NULL THEN
+                EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', fk.tbl, existing.conname);
+            END IF;
+            EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I FOREIGN KEY (%I) REFERENCES %I (id) ON DELETE %s',
+                           fk.tbl, fk.tbl || '_' || fk.col || '_fkey', fk.col, fk.ref, fk.action);
+            RAISE NOTICE '%.% now references % ON DELETE %', fk.tbl, fk.col, fk.ref, fk.action;
+        END IF;
+    END LOOP;
+END $$;
@@ -0,0 +1,68 @@
+-- Turns playdates into a table range-partitioned by month on playdate_time, and creates playdates_archive
+-- for the months `flask archive-playdates` moves out of it (see app/services/partition_service.py).
+-- Run once, after `flask db upgrade` has created the playdates table (empty or not):
+--     psql "$DATABASE_URL" -f partition_playdates.sql
+-- Safe to re-run. On a large table the copy below locks playdates for a while, so run it in a quiet period.
+
+-- 1. playdates: one partition per month from the oldest playdate to six months ahead, and a default
+--    partition for anything outside them. Each DO block runs as one transaction.
+DO $$
+DECLARE
+    month date;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'playdates'::regclass) THEN
+        RAISE NOTICE 'playdates is already partitioned';
+        RETURN;
+    END IF;
+
+    ALTER TABLE playdates RENAME TO playdates_unpartitioned;
+    CREATE TABLE playdates (LIKE playdates_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE (playdate_time);
+
+    month := date_trunc('month', coalesce((SELECT min(playdate_time) FROM playdates_unpartitioned), now()));
+    WHILE month <= date_trunc('month', now() + interval '6 months') LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF playdates FOR VALUES FROM (%L) TO (%L)',
+                       'playdates_' || to_char(month, 'YYYY_MM'), month, (month + interval '1 month')::date);
+        month := month + interval '1 month';
+    END LOOP;
+    CREATE TABLE playdates_default PARTITION OF playdates DEFAULT;
+
+    INSERT INTO playdates SELECT * FROM playdates_unpartitioned;
+    DROP TABLE playdates_unpartitioned;
+
+    -- The keys and indexes the models and migrations expect. The partition key must be part of the primary key.
+    ALTER TABLE playdates ADD CONSTRAINT playdates_pkey PRIMARY KEY (id, playdate_time);
+    ALTER TABLE playdates ADD CONSTRAINT playdates_dog1_id_fkey FOREIGN KEY (dog1_id) REFERENCES dogs (id) ON DELETE CASCADE;
+    ALTER TABLE playdates ADD CONSTRAINT playdates_dog2_id_fkey FOREIGN KEY (dog2_id) REFERENCES dogs (id) ON DELETE CASCADE;
+    ALTER TABLE playdates ADD CONSTRAINT playdates_requester_dog_id_fkey FOREIGN KEY (requester_dog_id) REFERENCES dogs (id) ON DELETE CASCADE;
+    CREATE INDEX ix_playdates_dog1_id ON playdates (dog1_id);
+    CREATE INDEX ix_playdates_dog2_id ON playdates (dog2_id);
+    CREATE INDEX ix_playdates_status ON playdates (status);
+    CREATE INDEX ix_playdates_updated_at ON playdates (updated_at);
+END $$;
+
+-- 2. playdates_archive: partitioned the same way, so archived months are attached as they are, without copying rows.
+--    db.create_all() (e.g. `python -m benchmarks generate --create-schema`) makes it a plain table, which can't take
+--    partitions; while it is still empty it is replaced.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('playdates_archive')) THEN
+        RAISE NOTICE 'playdates_archive already exists';
+        RETURN;
+    END IF;
+    IF to_regclass('playdates_archive') IS NOT NULL THEN
+        IF EXISTS (SELECT 1 FROM playdates_archive) THEN
+            RAISE EXCEPTION 'playdates_archive is a plain table with rows; move them back into playdates and drop it first';
+        END IF;
+        DROP TABLE playdates_archive;
+    END IF;
+
+    CREATE TABLE playdates_archive (LIKE playdates INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE (playdate_time);
+    ALTER TABLE playdates_archive ADD CONSTRAINT playdates_archive_pkey PRIMARY KEY (id, playdate_time);
+    ALTER TABLE playdates_archive ADD CONSTRAINT playdates_archive_dog1_id_fkey FOREIGN KEY (dog1_id) REFERENCES dogs (id) ON DELETE CASCADE;
+    ALTER TABLE playdates_archive ADD CONSTRAINT playdates_archive_dog2_id_fkey FOREIGN KEY (dog2_id) REFERENCES dogs (id) ON DELETE CASCADE;
+    ALTER TABLE playdates_archive ADD CONSTRAINT playdates_archive_requester_dog_id_fkey FOREIGN KEY (requester_dog_id) REFERENCES dogs (id) ON DELETE CASCADE;
+    CREATE INDEX ix_playdates_archive_dog1_id ON playdates_archive (dog1_id);
+    CREATE INDEX ix_playdates_archive_dog2_id ON playdates_archive (dog2_id);
+END $$;
@@ -1,10 +1,11 @@
+import os
 from app import create_app, db
 from app.models import models # Import all models to ensure they are known to SQLAlchemy and Flask-Migrate
 
 app = create_app()
 
 if __name__ == "__main__":
-    # For development, you might want to run with debug=True
-    # Ensure to set FLASK_ENV=development and FLASK_DEBUG=1 in your .env or environment
-    app.run(host="0.0.0.0", port=5000, debug=True)
-
+    # Development server only: single process, reloads on code changes when FLASK_DEBUG=1.
+    # In production run the multi-worker server instead: gunicorn -c gunicorn.conf.py wsgi:app
+    debug = os.environ.get("FLASK_DEBUG", "0").lower() in ("1", "true", "yes")
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=debug)
@@ -0,0 +1,69 @@
+"""
+Fixtures for the API tests.
+
+The tests run against the SQLite stand-in the benchmarks use, one database file
+per test, so they need no PostgreSQL server. Behaviour that only exists on
+PostgreSQL (partitions, pg_stat_activity) is not covered here.
+"""
+
+import uuid
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        JWT_SECRET_KEY = "test-only-jwt-secret-key-32-bytes-long"
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'pawpals.db'}"
+        DATABASE_REPLICA_URLS = []
+        METRICS_ENABLED = False
+        PURGE_IN_BACKGROUND = False
+        SYNC_SAFETY_LAG_SECONDS = 0
+        IDEMPOTENCY_WAIT_SECONDS = 0
+        MEDIA_ROOT = str(tmp_path / "media")
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(client):
+    """Register a user and return (user id, Authorization headers)."""
+
+    def make_user(name="Alex"):
+        response = client.post(
+            "/api/auth/register",
+            json={"name": name, "email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"},
+        )
+        assert response.status_code == 201
+        return response.json["user"]["id"], {"Authorization": f"Bearer {response.json['token']}"}
+
+    return make_user
+
+
+@pytest.fixture
+def token_for(app):
+    """An access token for a user id, with the given freshness."""
+
+    def token_for(user_id, fresh=False):
+        with app.app_context():
+            return create_access_token(identity=user_id, fresh=fresh)
+
+    return token_for
@@ -0,0 +1,93 @@
+import flask_jwt_extended.view_decorators
+import pytest
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity
+
+from app.utils.auth import jwt_required
+
+
+@pytest.fixture
+def count_decodes(monkeypatch):
+    """Count the JWT decodes flask_jwt_extended does to verify requests."""
+    calls = []
+    decode = flask_jwt_extended.view_decorators.decode_token
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args)
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(flask_jwt_extended.view_decorators, "decode_token", counting_decode)
+    return calls
+
+
+@pytest.fixture
+def fresh_only(app):
+    """A view that needs a fresh token, as a password change would."""
+
+    @jwt_required(fresh=True)
+    def whoami_fresh():
+        return jsonify({"id": get_jwt_identity()})
+
+    app.add_url_rule("/api/test/fresh", view_func=whoami_fresh)
+
+
+def batch(client, requests, headers=None):
+    response = client.post("/api/batch", json={"requests": requests}, headers=headers or {})
+    assert response.status_code == 200
+    return response.json["responses"]
+
+
+def test_sub_requests_run_as_the_caller_with_one_decode(client, make_user, count_decodes):
+    user_id, headers = make_user()
+    count_decodes.clear()
+
+    responses = batch(client, [
+        {"id": "me", "method": "GET", "path": "/api/auth/me"},
+        {"id": "dogs", "method": "GET", "path": "/api/dogs"},
+        {"id": "new", "method": "POST", "path": "/api/dogs", "body": {"name": "Rex"}},
+        {"id": "again", "method": "GET", "path": "/api/dogs"},
+    ], headers)
+
+    assert [(r["id"], r["status"]) for r in responses] == [("me", 200), ("dogs", 200), ("new", 201), ("again", 200)]
+    assert responses[0]["body"]["id"] == user_id
+    assert [dog["name"] for dog in responses[3]["body"]] == ["Rex"]
+    assert len(count_decodes) == 1
+
+
+def test_sub_request_authorization_header_is_ignored(client, make_user):
+    _, alex = make_user("Alex")
+    sam_id, sam = make_user("Sam")
+
+    responses = batch(client, [{"method": "GET", "path": "/api/auth/me", "headers": sam}], alex)
+
+    assert responses[0]["status"] == 200
+    assert responses[0]["body"]["id"] != sam_id
+
+
+def test_anonymous_batch_gets_401_for_protected_calls(client):
+    responses = batch(client, [{"method": "GET", "path": "/api/auth/me"}, {"method": "GET", "path": "/api/places"}])
+
+    assert [r["status"] for r in responses] == [401, 200]
+
+
+def test_fresh_requirement_applies_to_sub_requests(client, make_user, token_for, fresh_only):
+    user_id, _ = make_user()
+    spec = [{"method": "GET", "path": "/api/test/fresh"}]
+
+    stale = batch(client, spec, {"Authorization": f"Bearer {token_for(user_id)}"})
+    fresh = batch(client, spec, {"Authorization": f"Bearer {token_for(user_id, fresh=True)}"})
+
+    assert stale[0]["status"] == 401
+    assert fresh[0]["status"] == 200
+    assert fresh[0]["body"]["id"] == user_id
+
+
+def test_idempotency_key_on_a_sub_request_is_rejected(client, make_user):
+    _, headers = make_user()
+
+    response = client.post("/api/batch", headers=headers, json={"requests": [
+        {"method": "POST", "path": "/api/dogs", "body": {"name": "Rex"}, "headers": {"Idempotency-Key": "key-1"}},
+    ]})
+
+    assert response.status_code == 400
+    assert "Idempotency-Key" in response.json["message"]
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.models import Dog, IdempotencyKey
+
+
+def post_dog(client, headers, key, name="Rex"):
+    return client.post("/api/dogs", json={"name": name}, headers={**headers, "Idempotency-Key": key})
+
+
+def dog_count(app):
+    with app.app_context():
+        return Dog.query.count()
+
+
+def set_claim(app, key, **values):
+    with app.app_context():
+        db.session.query(IdempotencyKey).filter_by(key=key).update(values)
+        db.session.commit()
+
+
+def test_retry_replays_the_stored_response(app, client, make_user):
+    _, headers = make_user()
+
+    first = post_dog(client, headers, "key-1")
+    retry = post_dog(client, headers, "key-1")
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.json == first.json
+    assert dog_count(app) == 1
+
+
+def test_key_reused_for_a_different_request_is_rejected(app, client, make_user):
+    _, headers = make_user()
+    post_dog(client, headers, "key-1", name="Rex")
+
+    response = post_dog(client, headers, "key-1", name="Fido")
+
+    assert response.status_code == 422
+    assert dog_count(app) == 1
+
+
+def test_keys_are_scoped_to_the_caller(app, client, make_user):
+    _, alex = make_user("Alex")
+    _, sam = make_user("Sam")
+
+    first = post_dog(client, alex, "shared-key")
+    second = post_dog(client, sam, "shared-key")
+
+    assert first.status_code == second.status_code == 201
+    assert "Idempotent-Replayed" not in second.headers
+    assert first.json["id"] != second.json["id"]
+
+
+def test_retry_while_the_original_is_in_flight_gets_409(app, client, make_user):
+    _, headers = make_user()
+    post_dog(client, headers, "key-1")
+    # As if the first request were still running
+    set_claim(app, "key-1", status="in_progress", locked_at=datetime.utcnow())
+
+    response = post_dog(client, headers, "key-1")
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert dog_count(app) == 1
+
+
+def test_abandoned_claim_is_taken_over(app, client, make_user):
+    _, headers = make_user()
+    post_dog(client, headers, "key-1")
+    stale = datetime.utcnow() - timedelta(seconds=app.config["IDEMPOTENCY_LOCK_SECONDS"] + 1)
+    set_claim(app, "key-1", status="in_progress", locked_at=stale)
+
+    response = post_dog(client, headers, "key-1")
+
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert dog_count(app) == 2
+
+
+def test_client_errors_are_stored_except_401_and_429(app, client, make_user):
+    _, headers = make_user()
+
+    invalid = client.post("/api/dogs", json={}, headers={**headers, "Idempotency-Key": "key-1"})
+    assert invalid.status_code == 400
+    replay = client.post("/api/dogs", json={}, headers={**headers, "Idempotency-Key": "key-1"})
+    assert replay.status_code == 400
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+    unauthorized = client.post("/api/dogs", json={"name": "Rex"}, headers={"Idempotency-Key": "key-2"})
+    assert unauthorized.status_code == 401
+    with app.app_context():
+        assert IdempotencyKey.query.filter_by(key="key-2").count() == 0
@@ -0,0 +1,82 @@
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.models import Dog
+
+
+def sync_all(client, headers, token=None):
+    """Follow has_more to the end; returns the pages and the final token."""
+    pages = []
+    while True:
+        response = client.get("/api/sync", query_string={"since": token} if token else {}, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json)
+        token = response.json["token"]
+        if not response.json["has_more"]:
+            return pages, token
+
+
+def create_dogs(client, headers, count):
+    ids = []
+    for index in range(count):
+        response = client.post("/api/dogs", json={"name": f"Dog {index}"}, headers=headers)
+        assert response.status_code == 201
+        ids.append(response.json["id"])
+    return ids
+
+
+def test_pages_cover_every_row_once_across_timestamp_ties(app, client, make_user):
+    _, headers = make_user()
+    dog_ids = create_dogs(client, headers, 7)
+    with app.app_context():
+        # Every row on the same timestamp, so only the id tie-breaker keeps the pages apart
+        db.session.query(Dog).update({Dog.updated_at: datetime.utcnow() - timedelta(minutes=5)})
+        db.session.commit()
+    app.config["SYNC_PAGE_SIZE"] = 3
+
+    pages, _ = sync_all(client, headers)
+
+    seen = [dog["id"] for page in pages for dog in page["changes"]["dogs"]]
+    assert len(pages) >= 3
+    assert sorted(seen) == sorted(dog_ids)
+
+
+def test_delta_returns_changes_and_deletions_since_the_token(client, make_user):
+    _, headers = make_user()
+    kept, changed, removed = create_dogs(client, headers, 3)
+    _, token = sync_all(client, headers)
+
+    time.sleep(1.1)  # SQLite timestamps have whole-second precision
+    assert client.put(f"/api/dogs/{changed}", json={"name": "Renamed"}, headers=headers).status_code == 200
+    assert client.delete(f"/api/dogs/{removed}", headers=headers).status_code == 200
+
+    pages, token = sync_all(client, headers, token)
+    changes = [dog for page in pages for dog in page["changes"]["dogs"]]
+    deleted = [dog_id for page in pages for dog_id in page["deleted"]["dogs"]]
+    assert [dog["id"] for dog in changes] == [changed]
+    assert changes[0]["name"] == "Renamed"
+    assert deleted == [removed]
+    assert not any(page["reset"] for page in pages)
+
+    # Nothing changed since: the next delta is empty
+    pages, _ = sync_all(client, headers, token)
+    assert pages[0]["changes"]["dogs"] == [] and pages[0]["deleted"]["dogs"] == []
+
+
+def test_other_users_dogs_are_not_synced(client, make_user):
+    _, headers = make_user("Alex")
+    _, other_headers = make_user("Sam")
+    create_dogs(client, other_headers, 2)
+
+    pages, _ = sync_all(client, headers)
+
+    assert [dog for page in pages for dog in page["changes"]["dogs"]] == []
+
+
+def test_malformed_token_is_rejected(client, make_user):
+    _, headers = make_user()
+
+    response = client.get("/api/sync", query_string={"since": "not-a-token"}, headers=headers)
+
+    assert response.status_code == 400
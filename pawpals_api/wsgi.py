@@ -0,0 +1,4 @@
+from app import create_app
+from app.models import models # Import all models so mappers are configured before workers fork
+
+app = create_app()